@@ -0,0 +1,27 @@
+import zlib
+from contextlib import contextmanager
+from typing import Iterator
+
+from django.db import Error, connection
+
+
+def lock_id(name: str) -> int:
+    return zlib.crc32(name.encode("utf-8"))
+
+
+@contextmanager
+def advisory_lock(name: str) -> Iterator[bool]:
+    """Takes a Postgres session advisory lock without waiting; yields whether it was acquired."""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(%s)", [lock_id(name)])
+        acquired = cursor.fetchone()[0]
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT pg_advisory_unlock(%s)", [lock_id(name)])
+            except Error:
+                # Si la sesión se ha perdido, Postgres ya ha liberado el bloqueo
+                connection.close()
@@ -0,0 +1,29 @@
+import math
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional
+
+
+class LatencyTracker:
+    """Keeps the most recent latencies of each key to estimate its percentiles."""
+
+    def __init__(self, size: int = 200, min_samples: int = 20) -> None:
+        self.size = size
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, seconds: float) -> None:
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.size)
+            samples.append(seconds)
+
+    def percentile(self, key: str, rank: float) -> Optional[float]:
+        """Returns None until ``min_samples`` latencies have been recorded for ``key``."""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if not rank or len(samples) < self.min_samples:
+            return None
+        return samples[max(0, math.ceil(rank / 100 * len(samples)) - 1)]
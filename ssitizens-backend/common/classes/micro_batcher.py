@@ -0,0 +1,66 @@
+import threading
+from typing import Callable, Dict, Generic, Hashable, List, Optional, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class _Batch(Generic[T, R]):
+    def __init__(self) -> None:
+        self.items: List[T] = []
+        self.results: List[R] = []
+        self.error: Optional[BaseException] = None
+        self.full = threading.Event()
+        self.done = threading.Event()
+
+
+class MicroBatcher(Generic[T, R]):
+    """Groups concurrent submissions with the same key and runs them as one batch.
+
+    The first caller of a key waits up to ``window`` seconds (or until ``max_size``
+    items have joined), runs ``run_batch`` in its own thread and hands every caller
+    its result.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[Hashable, List[T]], List[R]],
+        window: float,
+        max_size: int,
+    ) -> None:
+        self.run_batch = run_batch
+        self.window = window
+        self.max_size = max_size
+        self._pending: Dict[Hashable, _Batch[T, R]] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key: Hashable, item: T) -> R:
+        with self._lock:
+            batch = self._pending.get(key)
+            leader = batch is None
+            if leader:
+                batch = _Batch()
+                self._pending[key] = batch
+            index = len(batch.items)
+            batch.items.append(item)
+            if len(batch.items) >= self.max_size:
+                del self._pending[key]
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.window)
+            with self._lock:
+                if self._pending.get(key) is batch:
+                    del self._pending[key]
+            try:
+                batch.results = self.run_batch(key, batch.items)
+            except BaseException as e:
+                batch.error = e
+            finally:
+                batch.done.set()
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+        return batch.results[index]
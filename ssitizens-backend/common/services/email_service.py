@@ -1,27 +1,68 @@
+import hashlib
 import logging
+from datetime import timedelta
 
 from django.conf import settings
-from django.core.mail import EmailMessage
-from django.http import HttpResponseRedirect
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from ssitizens.enums import EmailStatus
+from ssitizens.models import OutboundEmail
 
 
 class EmailService:
+    schedule_key = "email_delivery_scheduled"
+
     def __init__(self, subject, email, template):
         self.subject = subject
         self.email = email
         self.template = template
 
     def send_mail(self):
-        try:
-            email = EmailMessage(
-                self.subject,
-                self.template,
-                settings.DEFAULT_FROM_EMAIL,
-                [self.email],
+        # El correo se encola y lo entrega el worker de Celery, nunca se envía
+        # desde la petición HTTP o la sincronización de eventos
+        if not self.email:
+            logging.warning("Email without recipient discarded: %s", self.subject)
+            return None
+        subject = str(self.subject)
+        dedup_key = hashlib.sha256(
+            f"{self.email}\n{subject}\n{self.template}".encode("utf-8")
+        ).hexdigest()
+        window_start = timezone.now() - timedelta(seconds=settings.EMAIL_DEDUP_WINDOW)
+        duplicated = (
+            OutboundEmail.objects.filter(dedup_key=dedup_key, recipient=self.email)
+            .filter(
+                Q(status__in=[EmailStatus.pending.value, EmailStatus.sending.value])
+                | Q(status=EmailStatus.sent.value, sent_at__gte=window_start)
             )
-            email.content_subtype = "html"
-            email.send()
-            logging.info("Email sent")
-            return HttpResponseRedirect(".")
-        except Exception as e:
-            print(e)
+            .exists()
+        )
+        if duplicated:
+            logging.info("Duplicated email to %s skipped", self.email)
+            return None
+
+        email = OutboundEmail.objects.create(
+            recipient=self.email,
+            subject=subject,
+            body=self.template,
+            dedup_key=dedup_key,
+        )
+        transaction.on_commit(EmailService.schedule_delivery)
+        logging.info("Email queued")
+        return email
+
+    @staticmethod
+    def schedule_delivery():
+        from ssitizens.tasks import deliver_emails
+
+        # Los correos encolados durante el intervalo se entregan en un mismo lote; los reintentos
+        # los programa el barrido periódico de EmailTask con la misma clave
+        delay = settings.EMAIL_BATCH_DELAY
+        if cache.add(EmailService.schedule_key, True, delay):
+            try:
+                deliver_emails.apply_async(countdown=delay)
+            except Exception as e:
+                cache.delete(EmailService.schedule_key)
+                logging.error("Email delivery could not be scheduled: %s", e)
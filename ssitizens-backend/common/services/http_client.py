@@ -0,0 +1,52 @@
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class HttpClient:
+    _sessions: dict = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _build_session() -> requests.Session:
+        # Only idempotent GETs are retried, RPC calls are POSTs and must not be replayed
+        retry = Retry(
+            total=settings.HTTP_RETRIES,
+            backoff_factor=settings.HTTP_RETRY_BACKOFF,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(["GET"]),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=settings.HTTP_POOL_SIZE,
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    @staticmethod
+    def session(url: str) -> requests.Session:
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+        session = HttpClient._sessions.get(host)
+        if session is None:
+            with HttpClient._lock:
+                session = HttpClient._sessions.get(host)
+                if session is None:
+                    session = HttpClient._build_session()
+                    HttpClient._sessions[host] = session
+        return session
+
+    @staticmethod
+    def request(method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault(
+            "timeout", (settings.HTTP_CONNECT_TIMEOUT, settings.HTTP_READ_TIMEOUT)
+        )
+        return HttpClient.session(url).request(method, url, **kwargs)
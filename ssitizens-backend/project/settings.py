@@ -365,11 +365,21 @@ JAZZMIN_UI_TWEAKS = {
 
 ASGI_APPLICATION = "project.asgi.application"
 
-CHANNEL_LAYERS = {
-    "default": {
-        "BACKEND": "channels.layers.InMemoryChannelLayer",
-    },
-}  # TODO USE REDIS ?
+# Redis is needed for Celery workers to push events to the SSE consumers
+CHANNELS_REDIS_URL = os.environ.get("CHANNELS_REDIS_URL", "")
+if CHANNELS_REDIS_URL:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.core.RedisChannelLayer",
+            "CONFIG": {"hosts": [CHANNELS_REDIS_URL]},
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer",
+        },
+    }
 
 
 INTERNAL_IPS = ["*"]
@@ -398,17 +408,97 @@ TOKENIZATION_SERVICE_URL = os.environ.get("TOKENIZATION_SERVICE_URL", "")
 SESSION_EXPIRATION = os.environ.get("SESSION_EXPIRATION", 2)
 BLOCK_EXPLORER_URL = os.environ.get("BLOCK_EXPLORER_URL", "")
 
+# HTTP Client Settings
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 5))
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", 30))
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", 10))
+HTTP_RETRIES = int(os.environ.get("HTTP_RETRIES", 3))
+HTTP_RETRY_BACKOFF = float(os.environ.get("HTTP_RETRY_BACKOFF", 0.5))
+
+# Events Sync Settings
+EVENTS_SYNC_PAGE_SIZE = int(os.environ.get("EVENTS_SYNC_PAGE_SIZE", 500))
+EVENTS_WEBHOOK_SECRET = os.environ.get("EVENTS_WEBHOOK_SECRET", "")
+EVENTS_PUSH_DELAY = int(os.environ.get("EVENTS_PUSH_DELAY", 1))
+# Same depth the tokenization API rescans, so reorganised events are already fixed there
+EVENTS_CONFIRMATIONS = int(os.environ.get("EVENTS_CONFIRMATIONS", 10))
+# With push notifications the periodic sync is only a reconciliation sweep
+EVENTS_SYNC_INTERVAL = int(
+    os.environ.get("EVENTS_SYNC_INTERVAL", 15 if EVENTS_WEBHOOK_SECRET else 2)
+)
+
+# Task State Settings
+TASK_STATE_CACHE_TTL = float(os.environ.get("TASK_STATE_CACHE_TTL", 30))
+TASK_RUN_RETENTION_DAYS = int(os.environ.get("TASK_RUN_RETENTION_DAYS", 30))
+
+# Scheduler Settings
+# Disable when the jobs run in a dedicated `run_scheduler` process
+SCHEDULER_EMBEDDED = os.environ.get("SCHEDULER_EMBEDDED", "true").lower() in ["true", "1", "t"]
+# Seconds between leader election attempts and leader heartbeats
+SCHEDULER_ELECTION_INTERVAL = int(os.environ.get("SCHEDULER_ELECTION_INTERVAL", 15))
+
+# Balance Settings
+BALANCE_CACHE_TTL = int(os.environ.get("BALANCE_CACHE_TTL", 30))
+
+# Distribution Settings
+DISTRIBUTION_CHUNK_GAS = int(os.environ.get("DISTRIBUTION_CHUNK_GAS", 300000))
+DISTRIBUTION_GAS_PER_RECIPIENT = int(os.environ.get("DISTRIBUTION_GAS_PER_RECIPIENT", 35000))
+DISTRIBUTION_MAX_IN_FLIGHT = int(os.environ.get("DISTRIBUTION_MAX_IN_FLIGHT", 3))
+DISTRIBUTION_POLL_INTERVAL = float(os.environ.get("DISTRIBUTION_POLL_INTERVAL", 5))
+DISTRIBUTION_CONFIRMATION_TIMEOUT = int(os.environ.get("DISTRIBUTION_CONFIRMATION_TIMEOUT", 600))
+
+# Email Delivery Settings
+EMAIL_BATCH_SIZE = int(os.environ.get("EMAIL_BATCH_SIZE", 50))
+EMAIL_BATCH_DELAY = int(os.environ.get("EMAIL_BATCH_DELAY", 5))
+EMAIL_MAX_ATTEMPTS = int(os.environ.get("EMAIL_MAX_ATTEMPTS", 5))
+EMAIL_RETRY_BACKOFF = int(os.environ.get("EMAIL_RETRY_BACKOFF", 60))
+EMAIL_DEDUP_WINDOW = int(os.environ.get("EMAIL_DEDUP_WINDOW", 3600))
+
 # OpenAI Settings
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "")
 OPENAI_API_BASE = os.environ.get("OPENAI_API_BASE", "")
 OPENAI_API_VERSION = os.environ.get("OPENAI_API_VERSION", "")
 VISION_LLM_MODEL = os.environ.get("VISION_LLM_MODEL", "")
 CLASSIFICATION_LLM_MODEL = os.environ.get("CLASSIFICATION_LLM_MODEL", "")
+VISION_LLM_FALLBACK_MODEL = os.environ.get("VISION_LLM_FALLBACK_MODEL", "")
+CLASSIFICATION_LLM_FALLBACK_MODEL = os.environ.get("CLASSIFICATION_LLM_FALLBACK_MODEL", "")
+TICKET_VISION_DEADLINE = float(os.environ.get("TICKET_VISION_DEADLINE", 90))
+TICKET_CLASSIFICATION_DEADLINE = float(os.environ.get("TICKET_CLASSIFICATION_DEADLINE", 45))
+LLM_HEDGE_PERCENTILE = float(os.environ.get("LLM_HEDGE_PERCENTILE", 95))
+LLM_CALL_WORKERS = int(os.environ.get("LLM_CALL_WORKERS", 32))
+
+# Ticket Processing Settings
+TICKET_PROCESSING_MODE = os.environ.get("TICKET_PROCESSING_MODE", "sync")
+TICKET_CACHE_SIZE = int(os.environ.get("TICKET_CACHE_SIZE", 512))
+TICKET_CACHE_TTL = int(os.environ.get("TICKET_CACHE_TTL", 86400))
+AID_CATALOG_TTL = int(os.environ.get("AID_CATALOG_TTL", 300))
+TICKET_IMAGE_MAX_EDGE = int(os.environ.get("TICKET_IMAGE_MAX_EDGE", 2048))
+TICKET_IMAGE_FORMAT = os.environ.get("TICKET_IMAGE_FORMAT", "JPEG")
+TICKET_IMAGE_QUALITY = int(os.environ.get("TICKET_IMAGE_QUALITY", 85))
+TICKET_VISION_MODE = os.environ.get("TICKET_VISION_MODE", "combined")
+TICKET_VISION_CONCURRENCY = int(os.environ.get("TICKET_VISION_CONCURRENCY", 4))
+TICKET_MATCH_THRESHOLD = float(os.environ.get("TICKET_MATCH_THRESHOLD", 0.9))
+TICKET_LABEL_MIN_AGREEMENTS = int(os.environ.get("TICKET_LABEL_MIN_AGREEMENTS", 3))
+TICKET_BATCH_WINDOW = float(os.environ.get("TICKET_BATCH_WINDOW", 0))
+TICKET_BATCH_MAX_SIZE = int(os.environ.get("TICKET_BATCH_MAX_SIZE", 8))
+TICKET_MAX_CONCURRENT = int(os.environ.get("TICKET_MAX_CONCURRENT", 8))
+TICKET_QUEUE_SIZE = int(os.environ.get("TICKET_QUEUE_SIZE", 16))
+TICKET_QUEUE_TIMEOUT = float(os.environ.get("TICKET_QUEUE_TIMEOUT", 10))
+TICKET_UPLOAD_RATE = float(os.environ.get("TICKET_UPLOAD_RATE", 30))
+TICKET_UPLOAD_BURST = int(os.environ.get("TICKET_UPLOAD_BURST", 10))
+OPENAI_REPLAY_MODE = os.environ.get("OPENAI_REPLAY_MODE", "")
+OPENAI_REPLAY_PATH = os.environ.get(
+    "OPENAI_REPLAY_PATH", os.path.join(BASE_DIR, "llm_recordings.json")
+)
+OPENAI_REPLAY_LATENCY = float(os.environ.get("OPENAI_REPLAY_LATENCY", 0))
+OPENAI_REPLAY_FAILURE_RATE = float(os.environ.get("OPENAI_REPLAY_FAILURE_RATE", 0))
 
 # Pinata Settings
 PINATA_URL = os.environ.get("PINATA_URL", "")
 PINATA_GATEWAY_TOKEN = os.environ.get("PINATA_GATEWAY_TOKEN", "")
 PINATA_SECRET_JWT = os.environ.get("PINATA_SECRET_JWT", "")
+IPFS_CACHE_SIZE = int(os.environ.get("IPFS_CACHE_SIZE", 2048))
+IPFS_FETCH_WORKERS = int(os.environ.get("IPFS_FETCH_WORKERS", 4))
+IPFS_FAILURE_TTL = float(os.environ.get("IPFS_FAILURE_TTL", 60))
 
 # Local Settings
 DEMO_MODE = os.environ.get("DEMO_MODE", "false").lower() in ["true", "1", "t"]
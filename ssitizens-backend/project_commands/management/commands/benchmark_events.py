@@ -0,0 +1,136 @@
+import time
+from typing import Callable, Dict, List
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ssitizens.events.decoders import DECODERS, decode_event
+from ssitizens.events.events_serializers import (
+    ControllerRedemptionDataSerializer,
+    EventSerializer,
+    EventsFeedResponseSerializer,
+    IssuedDataSerializer,
+    PartyRemovedDataSerializer,
+    PartyUpdatedDataSerializer,
+    RedeemedDataSerializer,
+    TransferDataSerializer,
+    TransferWithDataEventSerializer,
+)
+from ssitizens.services.ipfs import IpfsService
+
+ADDRESS = "0x" + "ab" * 20
+CID = "bafkreibenchmarkeventsmetadata"
+SAMPLE_DATA = {
+    "Transfer": {"from": ADDRESS, "to": ADDRESS, "value": "1500000000000000000"},
+    "transferWithDataEvent": {
+        "from": ADDRESS,
+        "to": ADDRESS,
+        "value": "1500000000000000000",
+        "data": "0x" + CID.encode("utf-8").hex(),
+    },
+    "Issued": {
+        "_to": ADDRESS,
+        "_data": "0x",
+        "_value": "5000000000000000000",
+        "_operator": ADDRESS,
+    },
+    "Redeemed": {"_from": ADDRESS, "_data": "0x", "_value": "100", "_operator": ADDRESS},
+    "ControllerRedemption": {
+        "_data": "0x",
+        "_value": "100",
+        "_controller": ADDRESS,
+        "_tokenHolder": ADDRESS,
+        "_operatorData": "0x",
+    },
+    "PartyUpdated": {
+        "user": ADDRESS,
+        "expiration": "1767225600",
+        "permission": "1",
+        "attachedData": "0x",
+    },
+    "PartyRemoved": {"user": ADDRESS},
+    "executionComplete": {},
+}
+
+# Serializadores que aplicaba EventTask.event_type antes del registro de decodificadores
+DATA_SERIALIZERS = {
+    "Transfer": TransferDataSerializer,
+    "transferWithDataEvent": TransferWithDataEventSerializer,
+    "Issued": IssuedDataSerializer,
+    "Redeemed": RedeemedDataSerializer,
+    "ControllerRedemption": ControllerRedemptionDataSerializer,
+    "PartyUpdated": PartyUpdatedDataSerializer,
+    "PartyRemoved": PartyRemovedDataSerializer,
+}
+
+
+def build_page(size: int) -> dict:
+    types = list(SAMPLE_DATA)
+    events = [
+        {
+            "index": index,
+            "id": f"0x{index:064x}_{types[index % len(types)]}",
+            "hash": f"0x{index:064x}",
+            "type": types[index % len(types)],
+            "data": dict(SAMPLE_DATA[types[index % len(types)]]),
+            "timestamp": "2025-05-01T10:00:00.000Z",
+            "block_number": str(1000 + index),
+            "gas_used": "52000",
+        }
+        for index in range(size)
+    ]
+    metadata = {"next_cursor": "cursor", "has_more": False, "page_size": size}
+    return {"metadata": metadata, "events": events}
+
+
+def serializer_chain(page: dict) -> List[dict]:
+    # EventsService, save_as_txs y event_type serializaban cada evento en tres pasadas
+    EventsFeedResponseSerializer(page).data
+    decoded = []
+    for raw in page.get("events"):
+        event = EventSerializer(raw).data
+        serializer = DATA_SERIALIZERS.get(raw.get("type"))
+        data = serializer(raw.get("data")).data if serializer else raw.get("data")
+        decoded.append({"type": event.get("type"), "data": data})
+    return decoded
+
+
+def decoder_registry(page: dict) -> List:
+    return [decode_event(event) for event in page.get("events")]
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures how many events per second are decoded by the DRF serializer chain and by "
+        "the decoder registry used by EventTask.save_as_txs. No database or network is used."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--events", type=int, default=20000, help="Events per page")
+        parser.add_argument("--repeat", type=int, default=3, help="Runs, the best one counts")
+
+    def handle(self, *args, **options):
+        if options["events"] < 1 or options["repeat"] < 1:
+            raise CommandError("--events and --repeat must be positive")
+        missing = set(DECODERS) - set(SAMPLE_DATA)
+        if missing:
+            raise CommandError(f"No sample data for {sorted(missing)}")
+
+        # Los metadatos IPFS se sirven desde la caché en memoria para medir solo la decodificación
+        IpfsService.metadata_cache.set(CID, {"store_id": "benchmark"})
+        page = build_page(options["events"])
+
+        results: Dict[str, float] = {}
+        for name, decode in (("serializers", serializer_chain), ("decoders", decoder_registry)):
+            results[name] = self.measure(decode, page, options["repeat"])
+            self.stdout.write(f"{name:12}{results[name]:>14,.0f} events/s")
+        self.stdout.write(
+            self.style.SUCCESS(f"Speedup: {results['decoders'] / results['serializers']:.1f}x")
+        )
+
+    def measure(self, decode: Callable[[dict], List], page: dict, repeat: int) -> float:
+        best = float("inf")
+        for _ in range(repeat):
+            started_at = time.perf_counter()
+            decode(page)
+            best = min(best, time.perf_counter() - started_at)
+        return len(page.get("events")) / best
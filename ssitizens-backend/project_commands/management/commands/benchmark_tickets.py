@@ -0,0 +1,250 @@
+import json
+import math
+import mimetypes
+import os
+import resource
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from common.classes.admission import AdmissionLimiter, TokenBucket
+from common.classes.lru_cache import LRUCache
+from ticket_processing import pipeline, throttles
+from ticket_processing.replay import ReplayOpenAIClient
+from ticket_processing.signals import ticket_timed
+from ticket_processing.views import upload_images
+
+STAGES = ["request", "upload", "prompts", "vision", "classification", "records", "total"]
+
+stage_timings = threading.local()
+
+
+def record_timings(sender, timings: Dict[str, float], **kwargs):
+    # process_ticket se ejecuta en el mismo hilo que la petición (modo sync)
+    stage_timings.latest = timings
+
+
+def percentile(values: List[float], rank: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(rank / 100 * len(ordered)) - 1)]
+
+
+def max_rss_mb() -> float:
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+
+
+def load_corpus(path: str) -> List[List[Tuple[str, bytes, str]]]:
+    # Cada fichero es un ticket; cada subdirectorio, un ticket de varias páginas
+    receipts = []
+    for entry in sorted(os.listdir(path)):
+        entry_path = os.path.join(path, entry)
+        if os.path.isdir(entry_path):
+            files = [os.path.join(entry_path, name) for name in sorted(os.listdir(entry_path))]
+        else:
+            files = [entry_path]
+        pages = []
+        for file_path in files:
+            content_type, _ = mimetypes.guess_type(file_path)
+            if not content_type or not content_type.startswith("image/"):
+                continue
+            with open(file_path, "rb") as file:
+                pages.append((os.path.basename(file_path), file.read(), content_type))
+        if pages:
+            receipts.append(pages)
+    return receipts
+
+
+class Command(BaseCommand):
+    help = (
+        "Send a corpus of receipt images through upload_images and report "
+        "per-stage latency percentiles, parse success rate and memory high-water mark"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "corpus", help="Directory of receipt images; a subdirectory is a multi-page receipt"
+        )
+        parser.add_argument("--aid", required=True, help="Aid id used for every upload")
+        parser.add_argument("--user", default="ssitizens", help="Username sending the uploads")
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument(
+            "--requests", type=int, default=0, help="Number of uploads (default: one per receipt)"
+        )
+        parser.add_argument(
+            "--replay",
+            metavar="PATH",
+            help="Replay the responses recorded in PATH instead of calling Azure OpenAI",
+        )
+        parser.add_argument("--latency", type=float, default=0.0, help="Replay latency (s)")
+        parser.add_argument("--jitter", type=float, default=0.0, help="Replay latency jitter (s)")
+        parser.add_argument("--failure-rate", type=float, default=0.0)
+        parser.add_argument("--malformed-rate", type=float, default=0.0)
+        parser.add_argument("--seed", type=int, default=None)
+        parser.add_argument(
+            "--cache",
+            action="store_true",
+            help="Keep the vision/classification caches (by default every upload pays the models)",
+        )
+        parser.add_argument("--json", metavar="PATH", help="Also write the report as JSON")
+
+    def handle(self, *args, **options):
+        if settings.DEMO_MODE:
+            raise CommandError("DEMO_MODE is enabled, uploads would return demo tickets.")
+        if not os.path.isdir(options["corpus"]):
+            raise CommandError(f"Corpus directory not found: {options['corpus']}")
+        receipts = load_corpus(options["corpus"])
+        if not receipts:
+            raise CommandError("The corpus has no images.")
+        try:
+            self.user = get_user_model().objects.get(username=options["user"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"User not found: {options['user']}")
+        self.aid_id = options["aid"]
+        self.factory = APIRequestFactory()
+
+        replay_client = None
+        if options["replay"]:
+            replay_client = ReplayOpenAIClient(
+                options["replay"],
+                latency=options["latency"],
+                jitter=options["jitter"],
+                failure_rate=options["failure_rate"],
+                malformed_rate=options["malformed_rate"],
+                seed=options["seed"],
+            )
+            pipeline.openai_client = replay_client
+        if not options["cache"]:
+            pipeline.vision_cache = LRUCache(0)
+            pipeline.classification_cache = LRUCache(0)
+
+        # Las respuestas del benchmark (incluidas las simuladas) no se guardan como etiquetas: no
+        # deben llegar a la clasificación real ni evitar la etapa de clasificación en otras pasadas
+        pipeline.learn_labels = lambda *args, **kwargs: None
+        # Las subidas se envían como un único usuario: sin límite de ritmo ni de admisión, el
+        # informe mide el pipeline y no las respuestas 429/503
+        throttles.upload_buckets = TokenBucket(math.inf, math.inf)
+        throttles.upload_limiter = AdmissionLimiter(options["concurrency"], 0, 0)
+
+        total_requests = options["requests"] or len(receipts)
+        jobs = [receipts[i % len(receipts)] for i in range(total_requests)]
+        rss_start = max_rss_mb()
+        ticket_timed.connect(record_timings)
+        time_start = time.time()
+        try:
+            with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+                results = list(executor.map(self.send_receipt, jobs))
+        finally:
+            ticket_timed.disconnect(record_timings)
+        elapsed = time.time() - time_start
+
+        report = self.build_report(results, elapsed, options["concurrency"])
+        report["memory"] = {"start_mb": rss_start, "high_water_mb": max_rss_mb()}
+        if replay_client is not None:
+            report["replay"] = {"calls": replay_client.calls, "misses": replay_client.misses}
+        self.print_report(report)
+        if options["json"]:
+            with open(options["json"], "w", encoding="utf-8") as file:
+                json.dump(report, file, indent=2)
+
+    def send_receipt(self, pages: List[Tuple[str, bytes, str]]) -> Dict:
+        stage_timings.latest = None
+        images = [
+            SimpleUploadedFile(name, content, content_type=content_type)
+            for name, content, content_type in pages
+        ]
+        request = self.factory.post(
+            "/ticket_processing/upload/?mode=sync",
+            {"aid_id": self.aid_id, "images": images},
+            format="multipart",
+        )
+        force_authenticate(request, user=self.user)
+
+        result = {"status": None, "error": None, "parsed": False}
+        time_start = time.time()
+        try:
+            response = upload_images(request)
+            result["status"] = response.status_code
+            if response.status_code == 200:
+                result["parsed"] = "aid_products" in json.loads(response.content)
+        except Exception as e:
+            # Un error en parse_ticket_record llega aquí como excepción de la vista
+            result["error"] = type(e).__name__
+        finally:
+            # Cada hilo abre su propia conexión a la base de datos
+            connections.close_all()
+        result["request"] = time.time() - time_start
+
+        timings = stage_timings.latest
+        if timings is not None:
+            result.update(timings)
+            result["upload"] = result["request"] - timings["total"]
+        return result
+
+    def build_report(self, results: List[Dict], elapsed: float, concurrency: int) -> Dict:
+        statuses, errors = {}, {}
+        for result in results:
+            if result["error"]:
+                errors[result["error"]] = errors.get(result["error"], 0) + 1
+            else:
+                statuses[str(result["status"])] = statuses.get(str(result["status"]), 0) + 1
+
+        stages = {}
+        for stage in STAGES:
+            values = [result[stage] for result in results if stage in result]
+            stages[stage] = {
+                "count": len(values),
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "p99": percentile(values, 99),
+                "max": max(values, default=0.0),
+            }
+
+        parsed = sum(1 for result in results if result["parsed"])
+        return {
+            "requests": len(results),
+            "concurrency": concurrency,
+            "elapsed": elapsed,
+            "throughput": len(results) / elapsed if elapsed else 0.0,
+            "parse_success_rate": parsed / len(results),
+            "statuses": statuses,
+            "errors": errors,
+            "stages": stages,
+        }
+
+    def print_report(self, report: Dict):
+        self.stdout.write(
+            f"{report['requests']} uploads, concurrency {report['concurrency']}, "
+            f"{report['elapsed']:.2f}s ({report['throughput']:.2f} req/s)"
+        )
+        self.stdout.write(f"{'STAGE':16}{'COUNT':>8}{'P50':>10}{'P95':>10}{'P99':>10}{'MAX':>10}")
+        for stage, values in report["stages"].items():
+            self.stdout.write(
+                f"{stage:16}{values['count']:>8}{values['p50']:>10.3f}{values['p95']:>10.3f}"
+                f"{values['p99']:>10.3f}{values['max']:>10.3f}"
+            )
+        self.stdout.write(f"Status codes: {report['statuses']}")
+        if report["errors"]:
+            self.stdout.write(self.style.ERROR(f"Errors: {report['errors']}"))
+        if "replay" in report:
+            self.stdout.write(
+                f"Replay calls/misses: {report['replay']['calls']}/{report['replay']['misses']}"
+            )
+        self.stdout.write(
+            f"Memory high-water mark: {report['memory']['high_water_mb']:.1f} MB "
+            f"(start {report['memory']['start_mb']:.1f} MB)"
+        )
+        rate_style = self.style.SUCCESS if report["parse_success_rate"] == 1 else self.style.WARNING
+        self.stdout.write(rate_style(f"Parse success rate: {report['parse_success_rate']:.1%}"))
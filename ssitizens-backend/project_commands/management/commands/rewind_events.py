@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.eventstasks import EventTask
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-ingests the events of a block range from the tokenization API. Transactions of the "
+        "range that the API no longer has are removed, so a reorganisation or a wrong range is "
+        "repaired without a full resync."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from-block", type=int, required=True, help="First block")
+        parser.add_argument("--to-block", type=int, required=True, help="Last block, inclusive")
+
+    def handle(self, *args, **options):
+        if options["from_block"] < 0 or options["from_block"] > options["to_block"]:
+            raise CommandError("The block range is not valid")
+
+        result = EventTask.rewind(options["from_block"], options["to_block"])
+        if result is None:
+            raise CommandError("An events sync is running, try again when it finishes")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Re-ingested {result['reingested']} events, removed {result['removed']} "
+                "transactions"
+            )
+        )
@@ -0,0 +1,28 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from tasks.leader import run_scheduler
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs the scheduled jobs in a dedicated process. Several instances can run at once: "
+        "only the one elected leader through a Postgres advisory lock runs the jobs, and another "
+        "one takes over if it stops."
+    )
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+
+        def shutdown(signum, frame):
+            self.stdout.write("Stopping the scheduler")
+            stop.set()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+
+        self.stdout.write("Waiting to be elected scheduler leader")
+        run_scheduler(stop)
+        self.stdout.write(self.style.SUCCESS("Scheduler stopped"))
@@ -0,0 +1,202 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Tuple
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from common.classes.advisory_lock import advisory_lock
+from ssitizens.events.events import EventsService
+from tasks.eventstasks import EventTask
+from tasks.state import TaskStateStore
+
+PROGRESS_PREFIX = "backfill:"
+
+
+def progress_key(start: int, end: int) -> str:
+    return f"{PROGRESS_PREFIX}{start}-{end}"
+
+
+def partitions(start: int, end: int, size: int) -> List[Tuple[int, int]]:
+    return [(first, min(first + size, end)) for first in range(start, end, size)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Backfills blockchain events from the tokenization API into transactions, split into "
+        "partitions synchronised in parallel. Progress is stored per partition, so an "
+        "interrupted run resumes when launched again with the same range."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=int, help="First event index (default 0)")
+        parser.add_argument("--end", type=int, help="Event index to stop at, exclusive")
+        parser.add_argument("--from-block", type=int, help="First block of the range")
+        parser.add_argument("--to-block", type=int, help="Last block of the range, inclusive")
+        parser.add_argument("--partition-size", type=int, default=5000)
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument(
+            "--page-size",
+            type=int,
+            default=settings.EVENTS_SYNC_PAGE_SIZE,
+            help="Events requested per page",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore the stored progress and synchronise the whole range again",
+        )
+        parser.add_argument(
+            "--notify",
+            action="store_true",
+            help="Send the burn notification emails of the backfilled events",
+        )
+
+    def handle(self, *args, **options):
+        block_range = options["from_block"] is not None or options["to_block"] is not None
+        if block_range and (options["start"] is not None or options["end"] is not None):
+            raise CommandError("Use either an index range or a block range, not both")
+        if options["partition_size"] < 1 or options["workers"] < 1 or options["page_size"] < 1:
+            raise CommandError("--partition-size, --workers and --page-size must be positive")
+
+        start, end = self.resolve_range(options, block_range)
+        if start >= end:
+            self.stdout.write("No events to synchronise")
+            return
+
+        self.page_size = options["page_size"]
+        self.notify = options["notify"]
+        self.stop = threading.Event()
+        self.lock = threading.Lock()
+        self.synced = 0
+        self.finished = 0
+
+        parts = partitions(start, end, options["partition_size"])
+        if options["restart"]:
+            TaskStateStore.delete(*[progress_key(*part) for part in parts])
+        self.pending = sum(part[1] - self.get_progress(*part) for part in parts)
+        self.started_at = time.monotonic()
+        self.reported_at = 0.0
+        self.stdout.write(
+            f"Synchronising events [{start}, {end}) in {len(parts)} partitions with "
+            f"{options['workers']} workers, {self.pending} events pending"
+        )
+
+        executor = ThreadPoolExecutor(options["workers"])
+        futures = [executor.submit(self.sync_partition, *part) for part in parts]
+        errors = []
+        try:
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    errors.append(e)
+                    self.stop.set()
+        except KeyboardInterrupt:
+            # Las particiones terminan la página en curso y guardan su progreso
+            self.stop.set()
+            self.stdout.write(self.style.WARNING("Interrupted, waiting for the pages in flight"))
+            executor.shutdown(wait=True, cancel_futures=True)
+            self.report(force=True)
+            raise CommandError("Interrupted, run the command again with the same range to resume")
+        executor.shutdown(wait=True)
+        self.report(force=True)
+
+        if errors:
+            raise CommandError(
+                f"{len(errors)} partitions failed ({errors[0]}), run the command again with the "
+                "same range to resume"
+            )
+
+        TaskStateStore.delete(*[progress_key(*part) for part in parts])
+        self.advance_cursor(end)
+        self.stdout.write(self.style.SUCCESS(f"Synchronised {self.synced} events"))
+
+    def resolve_range(self, options, block_range: bool) -> Tuple[int, int]:
+        if block_range:
+            if options["from_block"] is None or options["to_block"] is None:
+                raise CommandError("--from-block and --to-block must be given together")
+            if options["from_block"] > options["to_block"]:
+                raise CommandError("--from-block must not be greater than --to-block")
+            # La API traduce el rango de bloques al rango de índices que lo cubre
+            try:
+                content = EventsService.events_range(
+                    options["from_block"], options["to_block"]
+                ).get("content")
+            except Exception as e:
+                if getattr(e, "status", None) == 404:
+                    return 0, 0
+                raise CommandError(f"Block range could not be resolved: {e}")
+            return content.get("start_index"), content.get("end_index")
+
+        start = options["start"] if options["start"] is not None else 0
+        end = options["end"]
+        if end is None:
+            content = EventsService.events({"index": 0, "size": 1}).get("content")
+            end = content.get("metadata").get("total")
+        if start < 0:
+            raise CommandError("--start must not be negative")
+        return start, end
+
+    def sync_partition(self, start: int, end: int):
+        try:
+            index = self.get_progress(start, end)
+            after = None
+            while index < end and not self.stop.is_set():
+                params = {"index": index, "size": min(self.page_size, end - index)}
+                if after:
+                    params["after"] = after
+                content = EventsService.events_after(params).get("content")
+                events = content.get("events")[: end - index]
+                if not events:
+                    break
+                EventTask.save_as_txs(
+                    {"events": events},
+                    content.get("metadata").get("head_block"),
+                    notify=self.notify,
+                )
+                index += len(events)
+                after = content.get("metadata").get("next_cursor")
+                self.set_progress(start, end, index)
+                self.add_synced(len(events))
+                if not content.get("metadata").get("has_more"):
+                    break
+            if index >= end or not self.stop.is_set():
+                with self.lock:
+                    self.finished += 1
+        finally:
+            connections.close_all()
+
+    def get_progress(self, start: int, end: int) -> int:
+        return TaskStateStore.get(progress_key(start, end), start)
+
+    def set_progress(self, start: int, end: int, index: int):
+        TaskStateStore.set(progress_key(start, end), index)
+
+    def add_synced(self, count: int):
+        with self.lock:
+            self.synced += count
+        self.report()
+
+    def report(self, force: bool = False):
+        now = time.monotonic()
+        with self.lock:
+            if not force and now - self.reported_at < 1:
+                return
+            self.reported_at = now
+            elapsed = max(now - self.started_at, 1e-6)
+            self.stdout.write(
+                f"{self.synced}/{self.pending} events, {self.synced / elapsed:.1f} events/s, "
+                f"{self.finished} partitions finished"
+            )
+
+    def advance_cursor(self, end: int):
+        # El barrido periódico no vuelve a paginar lo que ya se ha sincronizado
+        with advisory_lock(EventTask.lock_name) as acquired:
+            if not acquired:
+                return
+            cursor = EventTask.get_cursor()
+            if cursor is None or cursor.get("index") < end:
+                EventTask.set_cursor({"after": None, "index": end})
@@ -2,6 +2,7 @@ from django.contrib import admin
 
 from ssitizens.models import (
     IssuedVerifiableCredential,
+    OutboundEmail,
     Profile,
     Transaction,
     UserIdentification,
@@ -43,8 +44,8 @@ class UserIdentificationAdmin(admin.ModelAdmin):
 
 class TransactionAdmin(admin.ModelAdmin):
     model = Transaction
-    search_fields = ["hash"]
-    list_filter = ["event"]
+    search_fields = ["hash", "tx_hash"]
+    list_filter = ["event", "confirmed"]
     list_display = (
         "id",
         "hash",
@@ -53,13 +54,24 @@ class TransactionAdmin(admin.ModelAdmin):
         "amount_tokens",
         "amount_ethers",
         "event",
+        "block_number",
+        "confirmed",
         "timestamp",
     )
     ordering = ("-timestamp",)
     date_hierarchy = "timestamp"
 
 
+class OutboundEmailAdmin(admin.ModelAdmin):
+    model = OutboundEmail
+    search_fields = ["recipient", "subject"]
+    list_filter = ["status"]
+    list_display = ("id", "recipient", "subject", "status", "attempts", "created_at", "sent_at")
+    ordering = ("-created_at",)
+
+
 admin.site.register(Profile, ProfileAdmin)
 admin.site.register(Transaction, TransactionAdmin)
 admin.site.register(IssuedVerifiableCredential, IssuedVerifiableCredentialAdmin)
 admin.site.register(UserIdentification, UserIdentificationAdmin)
+admin.site.register(OutboundEmail, OutboundEmailAdmin)
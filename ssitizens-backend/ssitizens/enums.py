@@ -34,3 +34,14 @@ class EventType(str, Enum):
     @classmethod
     def choices(cls):
         return tuple((i.name, i.value) for i in cls)
+
+
+class EmailStatus(str, Enum):
+    pending = "pending"
+    sending = "sending"
+    sent = "sent"
+    failed = "failed"
+
+    @classmethod
+    def choices(cls):
+        return tuple((i.name, i.value) for i in cls)
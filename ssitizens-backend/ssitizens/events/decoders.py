@@ -0,0 +1,161 @@
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+from web3 import Web3
+
+from ssitizens.enums import EventType
+from ssitizens.services.ipfs import IpfsService
+
+
+@dataclass(slots=True)
+class EventRecord:
+    index: int
+    event: EventType
+    from_address: Optional[str]
+    to_address: Optional[str]
+    amount_tokens: Any
+    amount_ethers: Any
+    data: Any
+    timestamp: str
+    hash: str
+    log_index: Optional[int]
+    block_number: int
+
+
+Decoder = Callable[[dict], EventRecord]
+
+# Decodificadores por tipo de evento del contrato
+DECODERS: Dict[str, Decoder] = {}
+
+
+def decoder(*event_types: str):
+    def register(func: Decoder) -> Decoder:
+        for event_type in event_types:
+            DECODERS[event_type] = func
+        return func
+
+    return register
+
+
+def decode_event(event: dict) -> Optional[EventRecord]:
+    """Turns a raw event of the tokenization API into a record, or None if its type is ignored."""
+    decode = DECODERS.get(event["type"])
+    if decode is None:
+        return None
+    return decode(event)
+
+
+def decode_cid(data: str) -> str:
+    return bytearray.fromhex(str(data)[2:]).decode("utf-8")
+
+
+def record(
+    event: dict,
+    event_type: EventType,
+    tokens: Any = 0,
+    from_address: Optional[str] = None,
+    to_address: Optional[str] = None,
+    data: Any = None,
+) -> EventRecord:
+    return EventRecord(
+        index=event["index"],
+        event=event_type,
+        from_address=from_address,
+        to_address=to_address,
+        amount_tokens=Web3.from_wei(int(tokens or 0), "ether"),
+        # El gas se paga a 1 gwei
+        amount_ethers=Web3.from_wei(int(event.get("gas_used") or 0) * 10**9, "ether"),
+        data=data if data is not None else {},
+        timestamp=event["timestamp"],
+        hash=event["hash"],
+        log_index=event.get("log_index"),
+        block_number=int(event["block_number"]),
+    )
+
+
+@decoder("transferWithDataEvent")
+def transfer_with_data(event: dict) -> EventRecord:
+    data = event["data"]
+    try:
+        additional_data = IpfsService.get_metadata(decode_cid(data.get("data")))
+    except Exception:
+        additional_data = data.get("data")
+    return record(
+        event,
+        EventType.transfer,
+        data.get("value"),
+        data.get("from"),
+        data.get("to"),
+        additional_data,
+    )
+
+
+@decoder("Transfer")
+def transfer(event: dict) -> EventRecord:
+    data = event["data"]
+    return record(event, EventType.transfer, data.get("value"), data.get("from"), data.get("to"))
+
+
+@decoder("Issued")
+def issued(event: dict) -> EventRecord:
+    data = event["data"]
+    return record(
+        event,
+        EventType.generate,
+        data.get("_value"),
+        to_address=data.get("_to"),
+        data={"data": data.get("_data"), "operator": data.get("_operator")},
+    )
+
+
+@decoder("executionComplete")
+def execution_complete(event: dict) -> EventRecord:
+    return record(event, EventType.execution)
+
+
+@decoder("Redeemed")
+def redeemed(event: dict) -> EventRecord:
+    data = event["data"]
+    return record(
+        event,
+        EventType.burn,
+        data.get("_value"),
+        from_address=data.get("_from"),
+        data={"data": data.get("_data"), "operator_data": data.get("_operator")},
+    )
+
+
+@decoder("ControllerRedemption")
+def controller_redemption(event: dict) -> EventRecord:
+    data = event["data"]
+    return record(
+        event,
+        EventType.forcedBurn,
+        data.get("_value"),
+        to_address=data.get("_tokenHolder"),
+        data={
+            "data": data.get("_data"),
+            "controller": data.get("_controller"),
+            "operator_data": data.get("_operatorData"),
+        },
+    )
+
+
+@decoder("PartyUpdated")
+def party_updated(event: dict) -> EventRecord:
+    data = event["data"]
+    return record(
+        event,
+        EventType.assignRole,
+        to_address=data.get("user"),
+        data={
+            "expiration": data.get("expiration"),
+            "permission": data.get("permission"),
+            "attachedData": data.get("attachedData"),
+        },
+    )
+
+
+@decoder("PartyRemoved")
+def party_removed(event: dict) -> EventRecord:
+    return record(event, EventType.deleteRole, to_address=event["data"].get("user"))
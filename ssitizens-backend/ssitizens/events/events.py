@@ -1,8 +1,7 @@
 import json
 
-import requests
-
 from common.error.http_error import HTTPError
+from common.services.http_client import HttpClient
 from project import settings
 from ssitizens.events.events_serializers import EventsResponseSerializer
 
@@ -12,7 +11,7 @@ class EventsService:
     def events(params: dict) -> dict:
         try:
             url = settings.TOKENIZATION_SERVICE_URL + "/api/events"
-            response = requests.request("GET", url, params=params)
+            response = HttpClient.request("GET", url, params=params)
         except Exception as e:
             raise Exception(e)
 
@@ -27,11 +26,37 @@ class EventsService:
             )
         return return_dict
 
+    @staticmethod
+    def events_after(params: dict) -> dict:
+        try:
+            url = settings.TOKENIZATION_SERVICE_URL + "/api/events/feed"
+            response = HttpClient.request("GET", url, params=params)
+        except Exception as e:
+            raise Exception(e)
+
+        content = json.loads(response.content.decode("utf-8"))
+        if response.status_code != 200:
+            raise HTTPError(content=content, status=response.status_code)
+        # Los eventos se devuelven sin serializar, se decodifican en una pasada al guardarlos
+        return {"status_code": response.status_code, "content": content}
+
+    @staticmethod
+    def events_range(from_block: int, to_block: int) -> dict:
+        url = settings.TOKENIZATION_SERVICE_URL + "/api/events/range"
+        response = HttpClient.request(
+            "GET", url, params={"from_block": from_block, "to_block": to_block}
+        )
+
+        content = json.loads(response.content.decode("utf-8"))
+        if response.status_code != 200:
+            raise HTTPError(content=content, status=response.status_code)
+        return {"status_code": response.status_code, "content": content}
+
     @staticmethod
     def event_by_id(tx_hash: str) -> dict:
         try:
             url = settings.TOKENIZATION_SERVICE_URL + f"/api/events/{tx_hash}"
-            response = requests.request("GET", url)
+            response = HttpClient.request("GET", url)
         except Exception as e:
             raise Exception(e)
 
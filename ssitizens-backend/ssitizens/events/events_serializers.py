@@ -84,9 +84,9 @@ class EventSerializer(serializers.Serializer):
             representation["data"] = PartyRemovedDataSerializer(data).data
         elif event_type == "PartyUpdated":
             representation["data"] = PartyUpdatedDataSerializer(data).data
-        elif event_type == "Trasfer":
+        elif event_type == "Transfer":
             representation["data"] = TransferDataSerializer(data).data
-        elif event_type == "TrasferWithData":
+        elif event_type == "transferWithDataEvent":
             representation["data"] = TransferWithDataEventSerializer(data).data
 
         return representation
@@ -103,3 +103,15 @@ class MetadataSerializer(serializers.Serializer):
 class EventsResponseSerializer(serializers.Serializer):
     metadata = MetadataSerializer()
     events = EventSerializer(many=True)
+
+
+# Serializadores del feed de eventos por cursor
+class FeedMetadataSerializer(serializers.Serializer):
+    next_cursor = serializers.CharField(allow_null=True)
+    has_more = serializers.BooleanField()
+    page_size = serializers.IntegerField()
+
+
+class EventsFeedResponseSerializer(serializers.Serializer):
+    metadata = FeedMetadataSerializer()
+    events = EventSerializer(many=True)
@@ -0,0 +1,25 @@
+# Generated by Django 5.1 on 2026-10-18 08:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ssitizens', '0011_alter_transaction_from_user_alter_transaction_to'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IpfsMetadata',
+            fields=[
+                ('cid', models.CharField(max_length=255, primary_key=True, serialize=False, verbose_name='CID')),
+                ('content', models.JSONField(verbose_name='Content')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+            ],
+            options={
+                'verbose_name': 'IPFS Metadata',
+                'verbose_name_plural': 'IPFS Metadata',
+            },
+        ),
+    ]
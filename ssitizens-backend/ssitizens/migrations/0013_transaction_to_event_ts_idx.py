@@ -0,0 +1,17 @@
+# Generated by Django 5.1 on 2026-10-18 08:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ssitizens', '0012_ipfsmetadata'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['to', 'event', 'timestamp'], name='transaction_to_event_ts_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.1 on 2026-10-18 08:48
+
+from django.db import migrations, models
+
+
+def set_tx_hash(apps, schema_editor):
+    Transaction = apps.get_model("ssitizens", "Transaction")
+
+    # El hash guardado es la URL del explorador de bloques, el de la cadena es su último tramo
+    txs = []
+    for tx in Transaction.objects.only("id", "hash").iterator():
+        tx.tx_hash = tx.hash.rstrip("/").rsplit("/", 1)[-1] if tx.hash else None
+        txs.append(tx)
+    Transaction.objects.bulk_update(txs, ["tx_hash"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ssitizens', '0014_outboundemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='block_number',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='Block number'),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='confirmed',
+            field=models.BooleanField(default=True, verbose_name='Confirmed'),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='log_index',
+            field=models.IntegerField(blank=True, null=True, verbose_name='Log index'),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='tx_hash',
+            field=models.CharField(blank=True, max_length=66, null=True, verbose_name='Chain transaction hash'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['block_number'], name='transaction_block_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='transaction',
+            constraint=models.UniqueConstraint(fields=('tx_hash', 'log_index'), name='unique_transaction_event_log'),
+        ),
+        migrations.RunPython(set_tx_hash, migrations.RunPython.noop),
+    ]
@@ -2,9 +2,10 @@ import uuid
 
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
-from ssitizens.enums import EventType, Types
+from ssitizens.enums import EmailStatus, EventType, Types
 from ssitizens.services.balance import BalanceService
 from ticket_processing.models import Aid
 
@@ -101,10 +102,24 @@ class Transaction(models.Model):
     data = models.JSONField(_("Data"), blank=True, null=True)
     hash = models.CharField(_("Transaction Hash"))
     timestamp = models.DateTimeField(_("Timestamp"), blank=True, null=True)
+    # Identificador del evento en la cadena, estable aunque la API cambie sus índices
+    tx_hash = models.CharField(_("Chain transaction hash"), max_length=66, blank=True, null=True)
+    log_index = models.IntegerField(_("Log index"), blank=True, null=True)
+    block_number = models.BigIntegerField(_("Block number"), blank=True, null=True)
+    confirmed = models.BooleanField(_("Confirmed"), default=True)
 
     class Meta:
         verbose_name = _("Transaction")
         verbose_name_plural = _("Transactions")
+        indexes = [
+            models.Index(fields=["to", "event", "timestamp"], name="transaction_to_event_ts_idx"),
+            models.Index(fields=["block_number"], name="transaction_block_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["tx_hash", "log_index"], name="unique_transaction_event_log"
+            ),
+        ]
 
     def clean(self):
         if self.amount_tokens <= 0:
@@ -171,3 +186,44 @@ class IssuedVerifiableCredential(models.Model):
     class Meta:
         verbose_name = _("Issued Verifiable Credential")
         verbose_name_plural = _("Issued Verifiable Credentials")
+
+
+class IpfsMetadata(models.Model):
+    cid = models.CharField(_("CID"), max_length=255, primary_key=True)
+    content = models.JSONField(_("Content"))
+    created_at = models.DateTimeField(_("Created At"), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("IPFS Metadata")
+        verbose_name_plural = _("IPFS Metadata")
+
+    def __str__(self):
+        return self.cid
+
+
+class OutboundEmail(models.Model):
+    recipient = models.EmailField(_("Recipient"))
+    subject = models.CharField(_("Subject"), max_length=255)
+    body = models.TextField(_("Body"))
+    dedup_key = models.CharField(_("Deduplication Key"), max_length=64, db_index=True)
+    status = models.CharField(
+        _("Status"),
+        max_length=10,
+        choices=EmailStatus.choices(),
+        default=EmailStatus.pending.value,
+    )
+    attempts = models.PositiveSmallIntegerField(_("Attempts"), default=0)
+    last_error = models.TextField(_("Last Error"), blank=True, null=True)
+    next_attempt_at = models.DateTimeField(_("Next Attempt At"), default=timezone.now)
+    created_at = models.DateTimeField(_("Created At"), auto_now_add=True)
+    sent_at = models.DateTimeField(_("Sent At"), blank=True, null=True)
+
+    class Meta:
+        verbose_name = _("Outbound Email")
+        verbose_name_plural = _("Outbound Emails")
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="outbound_email_queue_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.recipient} - {self.subject}"
@@ -1,7 +1,9 @@
 import json
+import re
 
-import requests
+from django.core.cache import cache
 
+from common.services.http_client import HttpClient
 from project import settings
 
 
@@ -10,7 +12,7 @@ class BalanceService:
     def total_balance(address: str) -> dict:
         try:
             url = settings.TOKENIZATION_SERVICE_URL + f"/api/balance/all/{address}"
-            response = requests.request(
+            response = HttpClient.request(
                 "GET",
                 url,
             )
@@ -26,13 +28,118 @@ class BalanceService:
             }
         return return_dict
 
+    @staticmethod
+    def total_balances(addresses: list) -> dict:
+        try:
+            url = settings.TOKENIZATION_SERVICE_URL + "/api/balance/all"
+            response = HttpClient.request(
+                "POST",
+                url,
+                json={"addresses": addresses},
+            )
+        except Exception as e:
+            raise Exception(e)
+
+        if response.status_code != 200:
+            return {
+                "status_code": response.status_code,
+                "content": {
+                    address: {"ethers": 0.0, "tokens": 0.0} for address in addresses
+                },
+            }
+        content = json.loads(response.content.decode("utf-8"))
+        return {
+            "status_code": response.status_code,
+            "content": {
+                balance.get("address"): {
+                    "ethers": balance.get("ethers"),
+                    "tokens": balance.get("tokens"),
+                }
+                for balance in content.get("balances")
+            },
+        }
+
+
+class BalanceRefreshService:
+    cache_prefix = "balance"
+    # Maximum number of addresses accepted by the bulk balance endpoint
+    batch_size = 100
+    address_pattern = re.compile(r"^0x[a-fA-F0-9]{40}$")
+
+    @staticmethod
+    def cache_key(address: str) -> str:
+        return f"{BalanceRefreshService.cache_prefix}:{address.lower()}"
+
+    @staticmethod
+    def get_balances(addresses: list) -> dict:
+        addresses = list(dict.fromkeys(address for address in addresses if address))
+        if not addresses:
+            return {}
+
+        keys = {BalanceRefreshService.cache_key(address): address for address in addresses}
+        cached = cache.get_many(keys.keys())
+        balances = {keys[key]: value for key, value in cached.items()}
+
+        missing = []
+        for address in addresses:
+            if address in balances:
+                continue
+            if BalanceRefreshService.address_pattern.match(address):
+                missing.append(address)
+            else:
+                # The endpoint rejects the whole batch if a single address is malformed
+                balances[address] = {"ethers": 0.0, "tokens": 0.0}
+
+        to_cache = {}
+        for i in range(0, len(missing), BalanceRefreshService.batch_size):
+            response = BalanceService.total_balances(
+                missing[i : i + BalanceRefreshService.batch_size]
+            )
+            balances.update(response.get("content"))
+            # Failed lookups fall back to zero and must not be cached
+            if response.get("status_code") == 200:
+                to_cache.update(
+                    {
+                        BalanceRefreshService.cache_key(address): balance
+                        for address, balance in response.get("content").items()
+                    }
+                )
+        if to_cache:
+            cache.set_many(to_cache, timeout=settings.BALANCE_CACHE_TTL)
+        return balances
+
+    @staticmethod
+    def refresh(profiles: list) -> list:
+        from ssitizens.models import Profile
+
+        profiles = list(profiles)
+        balances = BalanceRefreshService.get_balances(
+            [profile.address for profile in profiles]
+        )
+
+        changed = []
+        for profile in profiles:
+            balance = balances.get(profile.address)
+            if balance is None:
+                continue
+            ethers = float(balance.get("ethers"))
+            tokens = float(balance.get("tokens"))
+            if profile.balance_ethers != ethers or profile.balance_tokens != tokens:
+                profile.balance_ethers = ethers
+                profile.balance_tokens = tokens
+                changed.append(profile)
+
+        if changed:
+            Profile.objects.bulk_update(changed, ["balance_ethers", "balance_tokens"])
+        return profiles
+
 
 class PermissionService:
     @staticmethod
     def get_permission(address: str) -> dict:
         try:
             url = settings.TOKENIZATION_SERVICE_URL + f"/api/permissions/{address}"
-            response = requests.request(
+            response = HttpClient.request(
                 "GET",
                 url,
             )
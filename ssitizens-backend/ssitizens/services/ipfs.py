@@ -1,18 +1,84 @@
 import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 
-import requests
-
+from common.classes.lru_cache import LRUCache
+from common.services.http_client import HttpClient
 from project import settings
+from ssitizens.models import IpfsMetadata
 from ssitizens.serializers import IpfsTicketSerializer
 
+# Distingue un CID que no ha fallado de uno que falló sin respuesta
+_missing = object()
+
 
 class IpfsService:
+    # Los CID son inmutables, así que su contenido se puede cachear sin caducidad
+    metadata_cache: LRUCache[dict] = LRUCache(settings.IPFS_CACHE_SIZE)
+    # Los fallos pueden ser transitorios, así que solo se recuerdan un momento para no repetirlos
+    failed_cache: LRUCache[Optional[dict]] = LRUCache(
+        settings.IPFS_CACHE_SIZE, ttl=settings.IPFS_FAILURE_TTL
+    )
+
     @staticmethod
     def get_metadata(cid: str) -> dict:
+        metadata = IpfsService.prefetch_metadata([cid])
+        if cid not in metadata:
+            raise Exception(f"Could not fetch IPFS metadata for {cid}")
+        return metadata[cid]
+
+    @staticmethod
+    def prefetch_metadata(cids: list) -> dict:
+        cids = list(dict.fromkeys(cids))
+        result = {}
+        failed = set()
+        for cid in cids:
+            content = IpfsService.metadata_cache.get(cid)
+            if content is None:
+                content = IpfsService.failed_cache.get(cid, _missing)
+                if content is _missing:
+                    continue
+                failed.add(cid)
+            if content is not None:
+                result[cid] = content
+
+        missing = [cid for cid in cids if cid not in result and cid not in failed]
+        if missing:
+            for stored in IpfsMetadata.objects.filter(cid__in=missing):
+                IpfsService.metadata_cache.set(stored.cid, stored.content)
+                result[stored.cid] = stored.content
+
+        missing = [cid for cid in missing if cid not in result]
+        if missing:
+            workers = min(settings.IPFS_FETCH_WORKERS, len(missing))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                fetched = list(executor.map(IpfsService.try_fetch_metadata, missing))
+            to_store = []
+            for cid, (content, found) in zip(missing, fetched):
+                if not found:
+                    IpfsService.failed_cache.set(cid, content)
+                if content is None:
+                    continue
+                result[cid] = content
+                if found:
+                    IpfsService.metadata_cache.set(cid, content)
+                    to_store.append(IpfsMetadata(cid=cid, content=content))
+            IpfsMetadata.objects.bulk_create(to_store, ignore_conflicts=True)
+        return result
+
+    @staticmethod
+    def try_fetch_metadata(cid: str) -> tuple:
+        try:
+            return IpfsService.fetch_metadata(cid)
+        except Exception:
+            return None, False
+
+    @staticmethod
+    def fetch_metadata(cid: str) -> tuple:
         try:
             params = {"pinataGatewayToken": settings.PINATA_GATEWAY_TOKEN}
             url = f"{settings.PINATA_URL}/ipfs/{cid}"
-            response = requests.request("GET", url, params=params)
+            response = HttpClient.request("GET", url, params=params)
         except Exception as e:
             raise Exception(e)
 
@@ -22,17 +88,17 @@ class IpfsService:
             return {
                 "status_code": response.status_code,
                 "content": {},
-            }
+            }, False
         return_data = IpfsTicketSerializer(return_dict.get("content")).data
 
-        return return_data
+        return json.loads(json.dumps(return_data)), True
 
     @staticmethod
     def get_ticket_image(cid: str) -> str:
         try:
             headers = {"Authorization": f"Bearer {settings.PINATA_GATEWAY_TOKEN}"}
             url = f"{settings.PINATA_URL}/files/{cid}"
-            response = requests.request("GET", url, headers=headers)
+            response = HttpClient.request("GET", url, headers=headers)
         except Exception as e:
             raise Exception(e)
 
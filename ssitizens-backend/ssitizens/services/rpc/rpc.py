@@ -3,10 +3,10 @@ import json
 from typing import List
 from uuid import uuid4
 
-import requests
 from django.utils.translation import gettext_lazy as _
 
 from common.error.http_error import HTTPError
+from common.services.http_client import HttpClient
 from project import settings
 from ssitizens.enums import Types
 from ssitizens.models import Profile
@@ -82,6 +82,28 @@ class RPCMethodsService:
             "status_code": rpc_response.get("status_code"),
         }
 
+    @staticmethod
+    def transaction_status(tx_hash: str) -> dict:
+        if not settings.TOKENIZATION_SERVICE_URL:
+            raise HTTPError(content=_("Tokenization service URL not set"), status=500)
+        url = f"{settings.TOKENIZATION_SERVICE_URL}/rpc/tx/{tx_hash}"
+        response = HttpClient.request("GET", url)
+        content = json.loads(response.content.decode("utf-8"))
+        if response.status_code != 200:
+            raise HTTPError(content=content, status=response.status_code)
+        return {"content": content, "status_code": response.status_code}
+
+    @staticmethod
+    def signer_nonce() -> dict:
+        if not settings.TOKENIZATION_SERVICE_URL:
+            raise HTTPError(content=_("Tokenization service URL not set"), status=500)
+        url = f"{settings.TOKENIZATION_SERVICE_URL}/rpc/nonce"
+        response = HttpClient.request("GET", url)
+        content = json.loads(response.content.decode("utf-8"))
+        if response.status_code != 200:
+            raise HTTPError(content=content, status=response.status_code)
+        return {"content": content, "status_code": response.status_code}
+
     @staticmethod
     def force_token_redemption(
         profile: Profile,
@@ -179,19 +201,19 @@ class RpcService:
 
     def send_request(self) -> dict:
         if not settings.TOKENIZATION_SERVICE_URL:
-            raise HTTPError(None, _("Tokenization service URL not set"), 500)
+            raise HTTPError(content=_("Tokenization service URL not set"), status=500)
         try:
             url = f"{settings.TOKENIZATION_SERVICE_URL}/rpc"
-            response = requests.request("POST", url, json=self.body)
+            response = HttpClient.request("POST", url, json=self.body)
         except Exception as e:
-            raise Exception(e)
+            raise Exception(e) from e
 
         content = json.loads(response.content.decode("utf-8"))
         return_dict = {"status_code": response.status_code, "content": content}
 
         if return_dict["status_code"] != 200:
             raise HTTPError(
-                None, return_dict.get("content"), return_dict.get("status_code")
+                content=return_dict.get("content"), status=return_dict.get("status_code")
             )
         if content.get("id") != self.body.get("id"):
             raise HTTPError(status=response.status_code, content=_("Not the same tx"))
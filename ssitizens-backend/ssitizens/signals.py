@@ -9,10 +9,9 @@ from django.utils.translation import gettext_lazy as _
 from common.services.email_service import EmailService
 from project.settings import BACKEND_DOMAIN, FRONTEND_URL
 from ssitizens.enums import Types
-from ssitizens.models import Profile, Transaction, UserIdentification
+from ssitizens.models import Profile, UserIdentification
 from ssitizens.services.balance import PermissionService
 from ssitizens.services.rpc.rpc import RPCMethodsService
-from tasks.models import Register
 
 
 @receiver(post_save, sender=Profile)
@@ -119,7 +118,3 @@ def pre_delete_profile(sender, instance: Profile, **kwargs):
     if instance.address:
         RPCMethodsService().unassign_role(instance)
 
-
-@receiver(pre_delete, sender=Transaction)
-def pre_delete_transaction(sender, instance: Transaction, **kwargs):
-    Register.objects.update(key="events", value=(int(instance.id) - 1))
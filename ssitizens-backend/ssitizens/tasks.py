@@ -0,0 +1,97 @@
+import logging
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from ssitizens.enums import EmailStatus
+from ssitizens.models import OutboundEmail
+
+update_fields = ["attempts", "status", "sent_at", "last_error", "next_attempt_at"]
+# Un correo reclamado por un worker que se cae vuelve a la cola pasado este tiempo
+claim_timeout = timedelta(minutes=10)
+
+
+def due_emails(now):
+    return OutboundEmail.objects.filter(
+        status__in=[EmailStatus.pending.value, EmailStatus.sending.value],
+        next_attempt_at__lte=now,
+    )
+
+
+@shared_task
+def deliver_emails():
+    while True:
+        batch = claim_batch()
+        if not batch:
+            return
+        send_batch(batch)
+        if len(batch) < settings.EMAIL_BATCH_SIZE:
+            return
+
+
+def claim_batch() -> list:
+    now = timezone.now()
+    with transaction.atomic():
+        # skip_locked permite que varios workers repartan la cola sin enviar dos veces
+        batch = list(
+            due_emails(now)
+            .select_for_update(skip_locked=True)
+            .order_by("next_attempt_at")[: settings.EMAIL_BATCH_SIZE]
+        )
+        # Los correos se marcan como reclamados y se envían fuera de la transacción
+        for email in batch:
+            email.status = EmailStatus.sending.value
+            email.next_attempt_at = now + claim_timeout
+        OutboundEmail.objects.bulk_update(batch, ["status", "next_attempt_at"])
+    return batch
+
+
+def send_batch(batch: list):
+    now = timezone.now()
+    try:
+        connection = get_connection(fail_silently=False)
+        connection.open()
+    except Exception as e:
+        logging.error("Email connection failed: %s", e)
+        for email in batch:
+            mark_failed_attempt(email, e, now)
+        OutboundEmail.objects.bulk_update(batch, update_fields)
+        return
+
+    # Una sola conexión para todo el lote; un destinatario erróneo no bloquea al resto
+    try:
+        for email in batch:
+            message = EmailMessage(
+                email.subject,
+                email.body,
+                settings.DEFAULT_FROM_EMAIL,
+                [email.recipient],
+                connection=connection,
+            )
+            message.content_subtype = "html"
+            try:
+                message.send()
+                email.attempts += 1
+                email.status = EmailStatus.sent.value
+                email.sent_at = timezone.now()
+            except Exception as e:
+                logging.error("Email to %s failed: %s", email.recipient, e)
+                mark_failed_attempt(email, e, now)
+    finally:
+        connection.close()
+    OutboundEmail.objects.bulk_update(batch, update_fields)
+
+
+def mark_failed_attempt(email: OutboundEmail, error: Exception, now):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= settings.EMAIL_MAX_ATTEMPTS:
+        email.status = EmailStatus.failed.value
+    else:
+        email.status = EmailStatus.pending.value
+        backoff = settings.EMAIL_RETRY_BACKOFF * 2 ** (email.attempts - 1)
+        email.next_attempt_at = now + timedelta(seconds=backoff)
@@ -0,0 +1,182 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.test import SimpleTestCase
+from django.utils.dateparse import parse_datetime
+from web3 import Web3
+
+from project_commands.management.commands.benchmark_events import (
+    ADDRESS,
+    CID,
+    SAMPLE_DATA,
+    build_page,
+)
+from ssitizens.enums import EventType
+from ssitizens.events.decoders import DECODERS, decode_event
+from ssitizens.events.events_serializers import EventSerializer
+from ssitizens.models import IpfsMetadata
+from ssitizens.services.ipfs import IpfsService
+
+METADATA = {"store_id": "tests"}
+
+
+def legacy_decode(raw: dict) -> dict:
+    # Resultado de la cadena de serializadores que usaba EventTask.event_type
+    event = EventSerializer(raw).data
+    data = event.get("data")
+    event_type = event.get("type")
+    if event_type == "transferWithDataEvent":
+        try:
+            additional_data = IpfsService.get_metadata(
+                bytearray.fromhex(str(data.get("data"))[2:]).decode("utf-8")
+            )
+        except Exception:
+            additional_data = data.get("data")
+        fields = (EventType.transfer, data.get("from_"), data.get("to"), data.get("value"))
+        fields += (additional_data,)
+    elif event_type == "Transfer":
+        fields = (EventType.transfer, data.get("from_"), data.get("to"), data.get("value"), {})
+    elif event_type == "Issued":
+        fields = (
+            EventType.generate,
+            None,
+            data.get("_to"),
+            data.get("_value"),
+            {"data": data.get("_data"), "operator": data.get("_operator")},
+        )
+    elif event_type == "executionComplete":
+        fields = (EventType.execution, None, None, 0.0, {})
+    elif event_type == "Redeemed":
+        fields = (
+            EventType.burn,
+            data.get("_from"),
+            None,
+            data.get("_value"),
+            {"data": data.get("_data"), "operator_data": data.get("_operator")},
+        )
+    elif event_type == "ControllerRedemption":
+        fields = (
+            EventType.forcedBurn,
+            None,
+            data.get("_tokenHolder"),
+            data.get("_value"),
+            {
+                "data": data.get("_data"),
+                "controller": data.get("_controller"),
+                "operator_data": data.get("_operatorData"),
+            },
+        )
+    elif event_type == "PartyUpdated":
+        fields = (
+            EventType.assignRole,
+            None,
+            data.get("user"),
+            0.0,
+            {
+                "expiration": data.get("expiration"),
+                "permission": data.get("permission"),
+                "attachedData": data.get("attachedData"),
+            },
+        )
+    elif event_type == "PartyRemoved":
+        fields = (EventType.deleteRole, None, data.get("user"), 0.0, {})
+    else:
+        return None
+
+    event_enum, from_address, to_address, tokens, additional_data = fields
+    return {
+        "index": event.get("index"),
+        "event": event_enum,
+        "from_address": from_address,
+        "to_address": to_address,
+        "amount_tokens": Web3.from_wei(float(tokens), "ether"),
+        "data": additional_data,
+        "timestamp": parse_datetime(event.get("timestamp")),
+        "hash": event.get("hash"),
+    }
+
+
+class EventDecoderTest(SimpleTestCase):
+    def setUp(self):
+        IpfsService.metadata_cache.set(CID, METADATA)
+        self.events = build_page(len(SAMPLE_DATA)).get("events")
+
+    def test_every_decoder_has_a_fixture(self):
+        self.assertEqual(set(DECODERS), {event["type"] for event in self.events})
+
+    def test_decoders_match_serializer_chain(self):
+        for raw in self.events:
+            with self.subTest(event_type=raw["type"]):
+                expected = legacy_decode(raw)
+                record = decode_event(raw)
+                self.assertEqual(
+                    {
+                        "index": record.index,
+                        "event": record.event,
+                        "from_address": record.from_address,
+                        "to_address": record.to_address,
+                        "amount_tokens": record.amount_tokens,
+                        "data": record.data,
+                        "timestamp": parse_datetime(record.timestamp),
+                        "hash": record.hash,
+                    },
+                    expected,
+                )
+
+    def test_transfer_with_data_without_metadata_keeps_raw_data(self):
+        raw = next(event for event in self.events if event["type"] == "transferWithDataEvent")
+        raw["data"]["data"] = "0xzz"
+        self.assertEqual(decode_event(raw).data, legacy_decode(raw)["data"])
+        self.assertEqual(decode_event(raw).data, "0xzz")
+
+    def test_unknown_event_type_is_ignored(self):
+        raw = dict(self.events[0], type="Approval")
+        self.assertIsNone(decode_event(raw))
+        self.assertIsNone(legacy_decode(raw))
+
+    def test_block_and_log_index(self):
+        raw = dict(self.events[0], log_index=3)
+        record = decode_event(raw)
+        self.assertEqual(record.block_number, int(raw["block_number"]))
+        self.assertEqual(record.log_index, 3)
+
+    def test_gas_is_paid_at_one_gwei(self):
+        # La cadena anterior multiplicaba por (10 ^ 9), un XOR, en lugar de por 10**9
+        record = decode_event(dict(self.events[0], gas_used="52000"))
+        self.assertEqual(record.amount_ethers, Decimal("0.000052"))
+
+    def test_addresses_are_not_renamed(self):
+        raw = next(event for event in self.events if event["type"] == "Transfer")
+        record = decode_event(raw)
+        self.assertEqual((record.from_address, record.to_address), (ADDRESS, ADDRESS))
+
+
+class IpfsPrefetchTest(SimpleTestCase):
+    def setUp(self):
+        self.addCleanup(IpfsService.failed_cache.clear)
+        patcher = mock.patch.object(IpfsMetadata, "objects")
+        patcher.start().filter.return_value = []
+        self.addCleanup(patcher.stop)
+
+    def prefetch(self, cid, fetched):
+        with mock.patch.object(
+            IpfsService, "try_fetch_metadata", return_value=fetched
+        ) as try_fetch:
+            metadata = IpfsService.prefetch_metadata([cid])
+            try:
+                metadata = {cid: IpfsService.get_metadata(cid)}
+            except Exception:
+                pass
+        return metadata, try_fetch.call_count
+
+    def test_unreachable_cid_is_requested_once(self):
+        self.assertEqual(self.prefetch("bad", (None, False)), ({}, 1))
+
+    def test_not_found_cid_is_requested_once(self):
+        not_found = {"status_code": 404, "content": {}}
+        self.assertEqual(self.prefetch("missing", (not_found, False)), ({"missing": not_found}, 1))
+
+    def test_failure_is_retried_after_the_ttl(self):
+        self.prefetch("bad", (None, False))
+        IpfsService.failed_cache.clear()
+        self.assertEqual(self.prefetch("bad", (None, False)), ({}, 1))
@@ -1,4 +1,5 @@
 import copy
+import hmac
 import json
 from datetime import datetime
 from uuid import uuid4
@@ -18,7 +19,12 @@ from drf_yasg.utils import swagger_auto_schema
 from project import settings
 from rest_framework import filters
 from rest_framework.authentication import BasicAuthentication, SessionAuthentication
-from rest_framework.decorators import action, api_view
+from rest_framework.decorators import (
+    action,
+    api_view,
+    authentication_classes,
+    permission_classes,
+)
 from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.permissions import AllowAny, DjangoModelPermissions
 from rest_framework.response import Response
@@ -50,9 +56,10 @@ from ssitizens.serializers import (
     VerificationSerializer,
     VPData,
 )
-from ssitizens.services.balance import BalanceService
+from ssitizens.services.balance import BalanceRefreshService, BalanceService
 from ssitizens.services.rpc.rpc import RPCMethodsService
 from ssitizens.services.vc_data.functions import get_data_provider
+from tasks.eventstasks import EventTask
 from weasyprint import HTML
 
 
@@ -155,10 +162,7 @@ class ProfileView(ModelViewSet):
 
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
-        check_balance = BalanceService.total_balance(instance.address)
-        instance.balance_ethers = check_balance.get("content").get("ethers")
-        instance.balance_tokens = check_balance.get("content").get("tokens")
-        instance.save()
+        BalanceRefreshService.refresh([instance])
 
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
@@ -167,13 +171,10 @@ class ProfileView(ModelViewSet):
         queryset = self.filter_queryset(self.get_queryset())
         paginator = CustomPagination()
 
-        for profile in queryset:
-            check_balance = BalanceService.total_balance(profile.address)
-            profile.balance_ethers = check_balance.get("content").get("ethers")
-            profile.balance_tokens = check_balance.get("content").get("tokens")
-            profile.save()
-
+        # Only the profiles of the requested page get their balance refreshed
         paginated_queryset = paginator.paginate_queryset(queryset, request)
+        BalanceRefreshService.refresh(paginated_queryset)
+
         serializer = self.get_serializer(paginated_queryset, many=True)
         return paginator.get_paginated_response(serializer.data)
 
@@ -256,9 +257,10 @@ class SSEConsumer(AsyncHttpConsumer):
 
     async def send_event(self, content):
         await self.send_body(
-            (f"event: did_received\ndata: {content.get('message')}\n\n").encode(
-                "utf-8"
-            ),
+            (
+                f"event: {content.get('event', 'did_received')}\n"
+                f"data: {content.get('message')}\n\n"
+            ).encode("utf-8"),
             more_body=False,
         )
 
@@ -838,3 +840,22 @@ class AdministratorView(ViewSet):
 @api_view(["GET"])
 def health_check(request):
     return Response({"status": "ok"}, status=200)
+
+
+@swagger_auto_schema(
+    method="post",
+    operation_description="Notify that the tokenization API stored new events. "
+    "Requires the X-Events-Secret header.",
+    responses={202: openapi.Response("Sync scheduled"), 403: openapi.Response("Invalid secret")},
+)
+@api_view(["POST"])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def events_notify(request):
+    secret = settings.EVENTS_WEBHOOK_SECRET
+    received = request.headers.get("X-Events-Secret", "")
+    if not secret or not hmac.compare_digest(received.encode("utf-8"), secret.encode("utf-8")):
+        return Response({"detail": "Invalid credentials."}, status=403)
+    # Solo se encola la sincronización; los eventos se leen del cursor, no del aviso
+    EventTask.schedule_sync()
+    return Response({"status": "scheduled"}, status=202)
@@ -1,22 +1,26 @@
 import sys
+import threading
 
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class TasksConfig(AppConfig):
     name = "tasks"
 
     def ready(self, *args, **kwargs):
-        from tasks.distributetasks import DistributeTask
-        from tasks.eventstasks import EventTask
-        from tasks.schedulertasks import LaunchScheduler
+        from tasks.leader import run_scheduler
 
         is_manage_py = any(arg.casefold().endswith("manage.py") for arg in sys.argv)
         is_runserver = any(arg.casefold() == "runserver" for arg in sys.argv)
 
-        if is_manage_py and is_runserver:
+        if is_manage_py and is_runserver and settings.SCHEDULER_EMBEDDED:
             # only run when runserver command is present
             print(" ====>> TaskConfig <<===")
-            LaunchScheduler.start()
-            DistributeTask.launch_distribute_batch()
-            EventTask.launch_search_events()
+            # Solo el nodo elegido como líder ejecuta las tareas programadas
+            threading.Thread(
+                target=run_scheduler,
+                args=(threading.Event(),),
+                name="scheduler-leader",
+                daemon=True,
+            ).start()
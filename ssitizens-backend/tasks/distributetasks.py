@@ -1,13 +1,24 @@
-from datetime import date, datetime
+import time
+from collections import deque
+from datetime import datetime, timedelta
 
+import requests
 from apscheduler.triggers.cron import CronTrigger
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from common.classes.advisory_lock import advisory_lock
+from common.error.http_error import HTTPError
+from project import settings
 from ssitizens.enums import EventType, Types
 from ssitizens.models import Profile, Transaction
 from ssitizens.services.rpc.rpc import RPCMethodsService
-from tasks.models import Register
+from tasks.enums import ChunkStatus, RunStatus
+from tasks.models import DistributionChunk, DistributionRun
 from tasks.schedulertasks import LaunchScheduler
+from tasks.state import TaskStateStore, track_run
 
 
 def task_print(str):
@@ -17,6 +28,8 @@ def task_print(str):
 class DistributeTask:
     task_id = "distribute_batch"
     task_job = None
+    # Gas fijo de una transacción, independiente del número de destinatarios
+    base_gas = 21000
 
     def launch_distribute_batch():
         print(" ==> launch_distribute_batch", DistributeTask.task_id)
@@ -32,49 +45,274 @@ class DistributeTask:
             )
 
     def distribute_tokens():
-        task_print("===>> START JOB <<===")
-        last_update_date = DistributeTask.get_latest_update_date()
-        profiles = DistributeTask.get_profiles()
-        task_print(f"- Fecha Actualización {last_update_date}")
-        task_print(f"- Total de cambios: {profiles}")
+        # Tras un cambio de líder el nodo anterior puede seguir enviando lotes
+        with advisory_lock(DistributeTask.task_id) as acquired:
+            if not acquired:
+                task_print("Distribution already running, skipping")
+                return
+            task_print("===>> START JOB <<===")
+            task_print(
+                f"- Fecha Actualización {TaskStateStore.last_success(DistributeTask.task_id)}"
+            )
+            with track_run(DistributeTask.task_id) as detail:
+                DistributeTask.run_distribution(detail)
+            task_print("===>> END JOB <<===")
 
-        if len(profiles.get("addresses")) == 0:
+    def run_distribution(detail: dict):
+        # Primero se retoman las ejecuciones que quedaron a medias
+        for run in DistributionRun.objects.exclude(status=RunStatus.completed.value).order_by(
+            "created_at"
+        ):
+            task_print(f"- Reanudando ejecución {run.id} ({run.period})")
+            DistributeTask.execute_run(run)
+
+        profiles = DistributeTask.get_profiles()
+        run = DistributeTask.create_run(profiles)
+        if run is None:
             task_print(_("No citizens to distribute tokens detected, skipping"))
-            task_print("===>> END JOB <<===")
             return
+        task_print(f"- Total de cambios: {len(profiles.get('addresses'))}")
+        detail.update({"run": run.id, "recipients": len(profiles.get("addresses"))})
+        DistributeTask.execute_run(run)
+
+    def create_run(profiles: dict) -> DistributionRun | None:
+        period = timezone.localtime().strftime("%Y-%m")
+
+        # Las direcciones ya incluidas en un lote de este mes no se vuelven a enviar
+        # aunque el evento de la transferencia todavía no se haya sincronizado
+        already_sent = set()
+        for addresses in (
+            DistributionChunk.objects.filter(run__period=period)
+            .exclude(status=ChunkStatus.failed.value)
+            .values_list("addresses", flat=True)
+        ):
+            already_sent.update(addresses)
+        recipients = [
+            (address, quantity)
+            for address, quantity in zip(profiles.get("addresses"), profiles.get("quantity"))
+            if address not in already_sent
+        ]
+        if not recipients:
+            return None
+
+        chunk_size = DistributeTask.chunk_size()
+        with transaction.atomic():
+            run = DistributionRun.objects.create(period=period)
+            DistributionChunk.objects.bulk_create(
+                DistributionChunk(
+                    run=run,
+                    position=position,
+                    addresses=[address for address, _quantity in chunk],
+                    quantities=[quantity for _address, quantity in chunk],
+                )
+                for position, chunk in enumerate(
+                    recipients[i : i + chunk_size] for i in range(0, len(recipients), chunk_size)
+                )
+            )
+        return run
+
+    def chunk_size() -> int:
+        # Cada lote tiene que caber en el límite de gas de una transacción
+        available = settings.DISTRIBUTION_CHUNK_GAS - DistributeTask.base_gas
+        return max(1, available // settings.DISTRIBUTION_GAS_PER_RECIPIENT)
+
+    def execute_run(run: DistributionRun):
+        # Solo se reenvían los lotes que con seguridad no se emitieron o que revirtieron
+        DistributionChunk.objects.filter(run=run, status=ChunkStatus.failed.value).update(
+            status=ChunkStatus.pending.value, tx_hash=None, nonce=None, submitted_at=None
+        )
+        pending = deque(run.chunks.filter(status=ChunkStatus.pending.value))
+        in_flight = list(
+            run.chunks.filter(
+                status__in=[ChunkStatus.submitting.value, ChunkStatus.submitted.value]
+            )
+        )
+
+        while pending or in_flight:
+            # Se envían lotes hasta llenar la ventana de transacciones sin confirmar
+            while pending and len(in_flight) < settings.DISTRIBUTION_MAX_IN_FLIGHT:
+                chunk = pending.popleft()
+                if DistributeTask.submit_chunk(chunk):
+                    in_flight.append(chunk)
+
+            if not in_flight:
+                continue
+            time.sleep(settings.DISTRIBUTION_POLL_INTERVAL)
+            in_flight = [chunk for chunk in in_flight if not DistributeTask.check_chunk(chunk)]
+
+            # Si un lote no se confirma a tiempo se deja para la siguiente ejecución
+            if any(DistributeTask.chunk_timed_out(chunk) for chunk in in_flight):
+                task_print(f"- Ejecución {run.id} interrumpida esperando confirmaciones")
+                run.status = RunStatus.interrupted.value
+                run.save(update_fields=["status", "updated_at"])
+                return
+
+        if run.chunks.exclude(status=ChunkStatus.confirmed.value).exists():
+            run.status = RunStatus.interrupted.value
+        else:
+            run.status = RunStatus.completed.value
+        run.save(update_fields=["status", "updated_at"])
+        task_print(f"- Ejecución {run.id}: {run.status}")
+
+    def submit_chunk(chunk: DistributionChunk) -> bool:
+        try:
+            nonce = RPCMethodsService.signer_nonce().get("content").get("pending")
+        except Exception as e:
+            task_print(f"- Lote {chunk.position}: error consultando el nonce {e}")
+            return False
+
+        # El lote se guarda como en duda antes del envío: si la respuesta se pierde o el proceso
+        # se cae, el nonce reservado permite saber si la transacción llegó a emitirse
+        chunk.status = ChunkStatus.submitting.value
+        chunk.nonce = nonce
+        chunk.tx_hash = None
+        chunk.submitted_at = timezone.now()
+        chunk.error = None
+        claimed = DistributionChunk.objects.filter(
+            pk=chunk.pk, status=ChunkStatus.pending.value
+        ).update(
+            status=chunk.status,
+            nonce=chunk.nonce,
+            tx_hash=None,
+            submitted_at=chunk.submitted_at,
+            error=None,
+            updated_at=chunk.submitted_at,
+        )
+        if not claimed:
+            # Otro proceso ya ha reclamado el lote
+            task_print(f"- Lote {chunk.position}: ya enviado por otra ejecución")
+            return False
+        try:
+            response = RPCMethodsService.distribute_tokens_batch(chunk.addresses, chunk.quantities)
+            result = response.get("content").get("result")
+            chunk.tx_hash = result.get("hash")
+            chunk.nonce = result.get("nonce")
+            chunk.status = ChunkStatus.submitted.value
+        except Exception as e:
+            chunk.error = str(e)
+            if DistributeTask.not_broadcast(e):
+                chunk.status = ChunkStatus.failed.value
+        chunk.save(update_fields=["tx_hash", "nonce", "status", "error", "updated_at"])
+        task_print(f"- Lote {chunk.position}: {chunk.status} {chunk.tx_hash or chunk.error}")
+        return chunk.status != ChunkStatus.failed.value
+
+    def not_broadcast(error: Exception) -> bool:
+        # Solo un rechazo 4xx o un fallo al conectar garantizan que no hubo envío; un tiempo
+        # de espera agotado, un error 5xx o una respuesta 200 con otro id pueden llegar después
+        # de emitirla
+        if isinstance(error, HTTPError):
+            return error.status is not None and 400 <= error.status < 500
+        return isinstance(error.__cause__, requests.ConnectTimeout)
+
+    def check_chunk(chunk: DistributionChunk) -> bool:
+        if chunk.tx_hash is None:
+            return DistributeTask.check_in_doubt(chunk)
+        try:
+            response = RPCMethodsService.transaction_status(chunk.tx_hash)
+            status = response.get("content").get("status")
+        except Exception as e:
+            task_print(f"- Lote {chunk.position}: error consultando estado {e}")
+            return False
+        if status == "confirmed":
+            chunk.status = ChunkStatus.confirmed.value
+        elif status == "failed":
+            chunk.status = ChunkStatus.failed.value
+            chunk.error = _("Transaction reverted")
+        elif (
+            status == "unknown"
+            and DistributeTask.chunk_timed_out(chunk)
+            and DistributeTask.nonce_released(chunk)
+        ):
+            # La transacción ya no puede minarse, se reenviará en la siguiente ejecución
+            chunk.status = ChunkStatus.failed.value
+            chunk.error = _("Transaction dropped")
         else:
-            response = RPCMethodsService.distribute_tokens_batch(
-                profiles.get("addresses"), profiles.get("quantity")
+            return False
+        chunk.save(update_fields=["status", "error", "updated_at"])
+        task_print(f"- Lote {chunk.position}: {chunk.status}")
+        return True
+
+    def check_in_doubt(chunk: DistributionChunk) -> bool:
+        # No hay hash: la llamada falló sin saber si la transacción se llegó a emitir
+        if DistributeTask.chunk_paid(chunk):
+            chunk.status = ChunkStatus.confirmed.value
+        elif DistributeTask.chunk_timed_out(chunk) and DistributeTask.nonce_released(chunk):
+            chunk.status = ChunkStatus.failed.value
+            chunk.error = _("Transaction not broadcast")
+        else:
+            return False
+        chunk.save(update_fields=["status", "error", "updated_at"])
+        task_print(f"- Lote {chunk.position}: {chunk.status}")
+        return True
+
+    def nonce_released(chunk: DistributionChunk) -> bool:
+        if chunk.nonce is None:
+            return False
+        try:
+            nonce = RPCMethodsService.signer_nonce().get("content")
+        except Exception as e:
+            task_print(f"- Lote {chunk.position}: error consultando el nonce {e}")
+            return False
+        if chunk.tx_hash is None:
+            # Sin transacciones del firmante desde el nonce reservado, el lote no se emitió
+            return nonce.get("pending") == chunk.nonce
+        # Otra transacción minada ocupó el nonce, o el reenvío usará el mismo y solo una de las
+        # dos podrá minarse
+        return nonce.get("latest") > chunk.nonce or nonce.get("pending") == chunk.nonce
+
+    def chunk_paid(chunk: DistributionChunk) -> bool:
+        # El nonce no dice si la transacción que lo ocupó era la del lote: se da por pagado
+        # si todos los destinatarios tienen una transferencia confirmada desde que empezó la
+        # ejecución
+        paid = (
+            Transaction.objects.filter(
+                event=EventType.transfer.value,
+                confirmed=True,
+                to__address__in=chunk.addresses,
+                timestamp__gte=chunk.run.created_at,
             )
-        # TODO: Guardar en Transaction list el hash del id devuelto por la llamada
+            .values("to__address")
+            .distinct()
+            .count()
+        )
+        return paid >= len(set(chunk.addresses))
 
-        # Añadimos al registro la fecha de actualización
-        DistributeTask.add_update_date_register()
-        task_print("===>> END JOB <<===")
+    def chunk_timed_out(chunk: DistributionChunk) -> bool:
+        if chunk.submitted_at is None:
+            return False
+        elapsed = (timezone.now() - chunk.submitted_at).total_seconds()
+        return elapsed > settings.DISTRIBUTION_CONFIRMATION_TIMEOUT
 
     def get_profiles():
         # Obtenemos todos los perfiles de usuarios de tipo Ciudadano
         # Si cumplen con los criterios (Address y condiciones)
         # Buscamos que no se haya generado Batch para ese mes en Transaction
 
-        citizens = Profile.objects.filter(
-            type=Types.beneficiary.value, terms_accepted=True, address__isnull=False
+        month_start = timezone.localtime().replace(
+            day=1, hour=0, minute=0, second=0, microsecond=0
+        )
+        next_month_start = (month_start + timedelta(days=32)).replace(day=1)
+        month_transfers = Transaction.objects.filter(
+            to=OuterRef("pk"),
+            event=EventType.transfer.value,
+            timestamp__gte=month_start,
+            timestamp__lt=next_month_start,
+        )
+
+        # Una única consulta: ciudadanos sin transferencias este mes (anti-join)
+        citizens = (
+            Profile.objects.filter(
+                type=Types.beneficiary.value, terms_accepted=True, address__isnull=False
+            )
+            .filter(~Exists(month_transfers))
+            .values_list("address", "data__aid_funds")
         )
 
         batch_array_address = []
         batch_array_quantity = []
-
-        for citizen in citizens:
-            # Si no hay, añadimos su address y fund a la lista para crear el array
-            transactions = Transaction.objects.filter(
-                to=citizen,
-                event=EventType.transfer.value,
-                timestamp__year=datetime.now.year,
-                timestamp__month=datetime.now.month,
-            )
-            if transactions.count() == 0:
-                batch_array_address.append(citizen.address)
-                batch_array_quantity.append(citizen.data.get("aid_funds"))
+        for address, aid_funds in citizens:
+            batch_array_address.append(address)
+            batch_array_quantity.append(aid_funds)
 
         return {"addresses": batch_array_address, "quantity": batch_array_quantity}
 
@@ -84,12 +322,3 @@ class DistributeTask:
         epoch_date = datetime.utcfromtimestamp(epoch_to_seconds)
         formatted_epoch_date = epoch_date.strftime("%Y-%m-%d")
         return formatted_epoch_date
-
-    def get_latest_update_date():
-        if Register.objects.filter(key="distribute_batch").last():
-            return Register.objects.filter(key="distribute_batch").last().value
-        return False
-
-    def add_update_date_register():
-        today = date.today().strftime("%d/%m/%Y")
-        Register.objects.create(key="distribute_batch", value=today)
@@ -0,0 +1,28 @@
+from apscheduler.triggers.cron import CronTrigger
+from django.utils import timezone
+
+from common.services.email_service import EmailService
+from ssitizens.tasks import due_emails
+from tasks.schedulertasks import LaunchScheduler
+
+
+class EmailTask:
+    task_id = "email_retries"
+    task_job = None
+
+    def launch_email_retries():
+        print(" ==> launch_email_retries", EmailTask.task_id)
+        if EmailTask.task_job is None:
+            EmailTask.task_job = LaunchScheduler.scheduler.add_job(
+                EmailTask.schedule_due_emails,
+                trigger=CronTrigger(minute="*"),
+                id=EmailTask.task_id,  # The `id` assigned to each job MUST be unique
+                max_instances=1,
+                replace_existing=True,
+            )
+
+    def schedule_due_emails():
+        # Un único barrido periódico reintenta los correos pendientes, las entregas no se
+        # reprograman a sí mismas
+        if due_emails(timezone.now()).exists():
+            EmailService.schedule_delivery()
@@ -0,0 +1,32 @@
+from enum import Enum
+
+
+class RunStatus(str, Enum):
+    running = "running"
+    completed = "completed"
+    interrupted = "interrupted"
+
+    @classmethod
+    def choices(cls):
+        return tuple((i.name, i.value) for i in cls)
+
+
+class ChunkStatus(str, Enum):
+    pending = "pending"
+    submitting = "submitting"
+    submitted = "submitted"
+    confirmed = "confirmed"
+    failed = "failed"
+
+    @classmethod
+    def choices(cls):
+        return tuple((i.name, i.value) for i in cls)
+
+
+class TaskRunStatus(str, Enum):
+    success = "success"
+    failed = "failed"
+
+    @classmethod
+    def choices(cls):
+        return tuple((i.name, i.value) for i in cls)
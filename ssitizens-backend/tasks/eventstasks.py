@@ -1,32 +1,25 @@
-from datetime import date, datetime
+import logging
+from datetime import datetime
 
 from apscheduler.triggers.cron import CronTrigger
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max, Min
 from django.template.loader import get_template
 from django.utils.translation import gettext_lazy as _
-from web3 import Web3
 
+from common.classes.advisory_lock import advisory_lock
+from common.error.http_error import HTTPError
 from common.services.email_service import EmailService
 from project import settings
 from ssitizens.enums import EventType
+from ssitizens.events.decoders import decode_cid, decode_event
 from ssitizens.events.events import EventsService
-from ssitizens.events.events_serializers import (
-    ControllerRedemptionDataSerializer,
-    EventSerializer,
-    EventsResponseSerializer,
-    EventsStructureResponseSerializer,
-    IssuedDataSerializer,
-    MetadataSerializer,
-    PartyRemovedDataSerializer,
-    PartyUpdatedDataSerializer,
-    RedeemedDataSerializer,
-    TransferDataSerializer,
-    TransferWithDataEventSerializer,
-)
 from ssitizens.models import Profile, Transaction
 from ssitizens.services.ipfs import IpfsService
-from tasks.models import Register
 from tasks.schedulertasks import LaunchScheduler
+from tasks.state import TaskStateStore, track_run
 
 
 def task_print(str):
@@ -36,13 +29,29 @@ def task_print(str):
 class EventTask:
     task_id = "events"
     task_job = None
+    cursor_key = "events_cursor"
+    lock_name = "events_sync"
+    schedule_key = "events_sync_scheduled"
+    update_fields = [
+        "event",
+        "from_user",
+        "to",
+        "amount_tokens",
+        "amount_ethers",
+        "data",
+        "timestamp",
+        "hash",
+        "block_number",
+        "confirmed",
+    ]
 
     def launch_search_events():
         print(" ==> launch_search_events", EventTask.task_id)
         if EventTask.task_job is None:
             EventTask.task_job = LaunchScheduler.scheduler.add_job(
                 EventTask.search_events,
-                trigger=CronTrigger(minute="*/2"),  # Cada 10 minutos
+                # Con avisos de la API de tokenización solo hace de barrido de reconciliación
+                trigger=CronTrigger(minute=f"*/{settings.EVENTS_SYNC_INTERVAL}"),
                 id=EventTask.task_id,  # The `id` assigned to each job MUST be unique
                 max_instances=1,
                 replace_existing=True,
@@ -50,212 +59,238 @@ class EventTask:
 
     def search_events():
         task_print("===>> START JOB <<===")
-        last_update_date = EventTask.get_latest_update_date()
-        events = EventTask.get_events()
-        task_print(f"- Fecha Actualización {last_update_date}")
+        task_print(f"- Fecha Actualización {TaskStateStore.last_success(EventTask.task_id)}")
+        events = EventTask.sync_events()
         task_print(f"- Total de cambios: {events}")
-
-        # Añadimos al registro la fecha de actualización
-        EventTask.add_update_date_register()
         task_print("===>> END JOB <<===")
 
-    def get_events():
-        txs = Transaction.objects.all().order_by("timestamp")
-        response = EventsService.events({})
-        total = MetadataSerializer(response.get("content")["metadata"]).data.get(
-            "total"
-        )
-        if total > len(txs):
-            # Serialización de los eventos
-            last_index: int = int(txs.last().id) + 1 if txs.last() is not None else 0
-            task_print(f"Last index: {last_index} ")
-            while last_index < total:
-                events = EventsService.events({"index": last_index, "size": 10})
-                EventTask.save_as_txs(events.get("content"))
-                last_index = int(last_index) + 10
-        return {"total": total}
+    def sync_events():
+        # El barrido periódico y los avisos pueden coincidir, solo uno avanza el cursor
+        with advisory_lock(EventTask.lock_name) as acquired:
+            if not acquired:
+                task_print("Sync already running, skipping")
+                return None
+            with track_run(EventTask.task_id) as detail:
+                result = EventTask.get_events()
+                detail.update(result)
+            return result
 
-    # Funciones auxiliares
-    def event_type(event_type: str, data: any) -> EventsStructureResponseSerializer:
-        if event_type == "transferWithDataEvent":
-            data = TransferWithDataEventSerializer(data).data
-            event_type = EventType.transfer.name
-            from_user = Profile.objects.filter(address=data.get("from_")).first()
-            to_user = Profile.objects.filter(address=data.get("to")).first()
-            tokens = data.get("value")
+    def schedule_sync():
+        from tasks.tasks import sync_events
+
+        # Los avisos que llegan durante el intervalo se resuelven con una sola sincronización
+        delay = settings.EVENTS_PUSH_DELAY
+        if cache.add(EventTask.schedule_key, True, delay):
             try:
-                cid = bytearray.fromhex(str(data.get("data"))[2:]).decode("utf-8")
-                additional_data = IpfsService.get_metadata(cid)
-            except Exception:
-                additional_data = data.get("data")
-            data_return = {
-                "event_type": event_type,
-                "from_user": from_user,
-                "to_user": to_user,
-                "tokens": tokens,
-                "data": additional_data,
-            }
+                sync_events.apply_async(countdown=delay)
+            except Exception as e:
+                cache.delete(EventTask.schedule_key)
+                logging.error("Events sync could not be scheduled: %s", e)
+
+    def get_events():
+        cursor = EventTask.get_cursor()
+        if cursor is None:
+            # Sin cursor se leen todos los eventos, las transacciones ya guardadas no se duplican
+            cursor = {"after": None, "index": 0}
+        task_print(f"Last index: {cursor.get('index')} ")
 
-            return data_return
-        elif event_type == "Transfer":
-            data = TransferDataSerializer(data).data
-            event_type = EventType.transfer.name
-            from_user = Profile.objects.filter(address=data.get("from_")).first()
-            to_user = Profile.objects.filter(address=data.get("to")).first()
-            tokens = data.get("value")
+        new_events = 0
+        head_block = None
+        while True:
+            params = {"index": cursor.get("index"), "size": settings.EVENTS_SYNC_PAGE_SIZE}
+            if cursor.get("after"):
+                params["after"] = cursor.get("after")
+            content = EventsService.events_after(params).get("content")
+            events = content.get("events")
+            head_block = content.get("metadata").get("head_block")
+            if events:
+                EventTask.save_as_txs(content, head_block)
+                new_events += len(events)
+                cursor = {
+                    "after": content.get("metadata").get("next_cursor"),
+                    "index": cursor.get("index") + len(events),
+                }
+                EventTask.set_cursor(cursor)
+            if not content.get("metadata").get("has_more"):
+                break
 
-            data_return = {
-                "event_type": event_type,
-                "from_user": from_user,
-                "to_user": to_user,
-                "tokens": tokens,
-                "data": {},
-            }
-            return data_return
-        elif event_type == "Issued":
-            data = IssuedDataSerializer(data).data
-            event_type = EventType.generate.name
-            to_user = Profile.objects.filter(address=data.get("_to")).first()
-            tokens = data.get("_value")
-            additional_data = {
-                "data": data.get("_data"),
-                "operator": data.get("_operator"),
-            }
+        finalised = EventTask.finalise_pending(head_block)
+        return {"new": new_events, "index": cursor.get("index"), **finalised}
 
-            data_return = {
-                "event_type": event_type,
-                "to_user": to_user,
-                "tokens": tokens,
-                "data": additional_data,
-            }
-            return data_return
-        elif event_type == "executionComplete":
-            event_type = EventType.execution.name
-            data_return = {
-                "event_type": event_type,
-                "tokens": 0.0,
-                "data": {},
-            }
-            return data_return
-        elif event_type == "Redeemed":
-            data = RedeemedDataSerializer(data).data
-            event_type = EventType.burn.name
-            from_user = Profile.objects.filter(address=data.get("_from")).first()
-            tokens = data.get("_value")
-            additional_data = {
-                "data": data.get("_data"),
-                "operator_data": data.get("_operator"),
-            }
-            data_return = {
-                "event_type": event_type,
-                "from_user": from_user,
-                "tokens": tokens,
-                "data": additional_data,
-            }
+    def finalise_pending(head_block: int | None) -> dict:
+        if head_block is None:
+            return {}
+        bounds = Transaction.objects.filter(
+            confirmed=False, block_number__lte=head_block - settings.EVENTS_CONFIRMATIONS
+        ).aggregate(first=Min("block_number"), last=Max("block_number"))
+        if bounds.get("first") is None:
+            return {}
+        # Antes de confirmarlos se vuelven a leer, por si sus bloques se han reorganizado
+        return EventTask.reingest_blocks(bounds.get("first"), bounds.get("last"))
 
-            return data_return
-        elif event_type == "ControllerRedemption":
-            data = ControllerRedemptionDataSerializer(data).data
-            event_type = EventType.forcedBurn.name
-            to_user = Profile.objects.filter(address=data.get("_tokenHolder")).first()
-            tokens = data.get("_value")
-            additional_data = {
-                "data": data.get("_data"),
-                "controller": data.get("_controller"),
-                "operator_data": data.get("_operatorData"),
-            }
-            data_return = {
-                "event_type": event_type,
-                "to_user": to_user,
-                "tokens": tokens,
-                "data": additional_data,
-            }
-            return data_return
-        elif event_type == "PartyUpdated":
-            data = PartyUpdatedDataSerializer(data).data
-            event_type = EventType.assignRole.name
-            to_user = Profile.objects.filter(address=data.get("user")).first()
+    def rewind(from_block: int, to_block: int) -> dict | None:
+        with advisory_lock(EventTask.lock_name) as acquired:
+            if not acquired:
+                return None
+            return EventTask.reingest_blocks(from_block, to_block)
 
-            additional_data = {
-                "expiration": data.get("expiration"),
-                "permission": data.get("permission"),
-                "attachedData": data.get("attachedData"),
-            }
-            data_return = {
-                "event_type": event_type,
-                "to_user": to_user,
-                "tokens": 0.0,
-                "data": additional_data,
-            }
+    def reingest_blocks(from_block: int, to_block: int) -> dict:
+        task_print(f"Re-ingesting blocks {from_block}-{to_block}")
+        seen = set()
+        try:
+            bounds = EventsService.events_range(from_block, to_block).get("content")
+        except HTTPError as e:
+            if e.status != 404:
+                raise
+            bounds = {"start_index": 0, "end_index": 0}
 
-            return data_return
-        elif event_type == "PartyRemoved":
-            data = PartyRemovedDataSerializer(data).data
-            event_type = EventType.deleteRole.name
-            to_user = Profile.objects.filter(address=data.get("user")).first()
+        # El rango de índices cubre el de bloques, pero puede incluir eventos de otros bloques
+        index, end, after = bounds.get("start_index"), bounds.get("end_index"), None
+        while index < end:
+            params = {"index": index, "size": min(settings.EVENTS_SYNC_PAGE_SIZE, end - index)}
+            if after:
+                params["after"] = after
+            content = EventsService.events_after(params).get("content")
+            events = content.get("events")[: end - index]
+            if not events:
+                break
+            in_range = [
+                event
+                for event in events
+                if from_block <= int(event.get("block_number")) <= to_block
+            ]
+            EventTask.save_as_txs({"events": in_range}, content.get("metadata").get("head_block"))
+            seen.update((event.get("hash"), event.get("log_index")) for event in in_range)
+            index += len(events)
+            after = content.get("metadata").get("next_cursor")
+            if not content.get("metadata").get("has_more"):
+                break
 
-            data_return = {
-                "event_type": event_type,
-                "to_user": to_user,
-                "tokens": 0.0,
-                "data": {},
-            }
-            return data_return
+        # Las transacciones del rango que la API ya no tiene pertenecían a bloques reorganizados
+        stale = [
+            pk
+            for pk, tx_hash, log_index in Transaction.objects.filter(
+                block_number__gte=from_block, block_number__lte=to_block
+            ).values_list("id", "tx_hash", "log_index")
+            if (tx_hash, log_index) not in seen
+        ]
+        Transaction.objects.filter(id__in=stale).delete()
+        return {"reingested": len(seen), "removed": len(stale)}
 
-    def save_as_txs(events: EventsResponseSerializer):
-        for event in events.get("events"):
-            event = EventSerializer(event).data
-            event_type = EventsStructureResponseSerializer(
-                EventTask.event_type(event.get("type"), event.get("data"))
-            ).data
+    # Funciones auxiliares
+    def save_as_txs(events: dict, head_block: int | None = None, notify: bool = True):
+        events = events.get("events")
 
-            from_user = (
-                Profile.objects.filter(id=(event_type.get("from_user")["id"])).first()
-                if event_type.get("from_user") is not None
-                else None
+        # Los metadatos IPFS de la página se descargan de una vez y en paralelo
+        cids = []
+        for event in events:
+            if event.get("type") == "transferWithDataEvent":
+                try:
+                    cids.append(decode_cid(event.get("data").get("data")))
+                except Exception:
+                    continue
+        IpfsService.prefetch_metadata(cids)
+
+        records = []
+        for record in map(decode_event, events):
+            if record is None:
+                continue
+            if record.log_index is None:
+                logging.warning(f"Event {record.hash} without log index skipped")
+                continue
+            records.append(record)
+        if not records:
+            return
+
+        # Se resuelven todas las direcciones de la página con una sola consulta
+        addresses = {
+            address
+            for record in records
+            for address in (record.from_address, record.to_address)
+            if address
+        }
+        profiles = {
+            profile.address: profile
+            for profile in Profile.objects.filter(address__in=addresses)
+        }
+
+        hashes = {record.hash for record in records}
+        confirmed = set()
+        for tx_hash, log_index in Transaction.objects.filter(
+            tx_hash__in=hashes, confirmed=True
+        ).values_list("tx_hash", "log_index"):
+            confirmed.add((tx_hash, log_index))
+            # Las filas sin log_index son anteriores y se sustituyen por las de cada evento
+            if log_index is None:
+                confirmed.add(tx_hash)
+
+        # Los eventos a menos de EVENTS_CONFIRMATIONS bloques de la cabeza quedan pendientes
+        confirmations = settings.EVENTS_CONFIRMATIONS
+        confirmed_until = head_block - confirmations if head_block is not None else None
+        txs = [
+            Transaction(
+                event=record.event,
+                from_user=profiles.get(record.from_address),
+                to=profiles.get(record.to_address),
+                amount_tokens=record.amount_tokens,
+                amount_ethers=record.amount_ethers,
+                data=record.data,
+                timestamp=record.timestamp,
+                hash=f"{settings.BLOCK_EXPLORER_URL}/{record.hash}",
+                tx_hash=record.hash,
+                log_index=record.log_index,
+                block_number=record.block_number,
+                confirmed=confirmations <= 0
+                or (confirmed_until is not None and record.block_number <= confirmed_until)
+                or (record.hash, record.log_index) in confirmed
+                or record.hash in confirmed,
             )
-            to_user = (
-                Profile.objects.filter(id=(event_type.get("to_user")["id"])).first()
-                if event_type.get("to_user") is not None
-                else None
+            for record in records
+        ]
+
+        with transaction.atomic():
+            Transaction.objects.filter(tx_hash__in=hashes, log_index__isnull=True).delete()
+            Transaction.objects.bulk_create(
+                txs,
+                update_conflicts=True,
+                unique_fields=["tx_hash", "log_index"],
+                update_fields=EventTask.update_fields,
             )
 
-            tx = Transaction.objects.update_or_create(
-                id=event.get("index"),
-                event=EventType(event_type.get("event_type")),
-                from_user=from_user,
-                to=to_user,
-                amount_tokens=Web3.from_wei(float(event_type.get("tokens")), "ether"),
-                amount_ethers=Web3.from_wei(
-                    float(event.get("gas_used") * (10 ^ 9)), "ether"
-                ),
-                data=event_type.get("data"),
-                timestamp=event.get("timestamp"),
-                hash=f"{settings.BLOCK_EXPLORER_URL}/{event.get('hash')}",
+        if not notify:
+            return
+        # Cada pago se notifica una sola vez, cuando se confirma
+        for tx in txs:
+            if (
+                tx.event is EventType.burn
+                and tx.confirmed
+                and (tx.tx_hash, tx.log_index) not in confirmed
+                and tx.tx_hash not in confirmed
+            ):
+                EventTask.notify_burn(tx)
+
+    def notify_burn(tx: Transaction):
+        subject = _("Payment Request Information")
+        admin = User.objects.filter(is_superuser=True).first()
+        if admin is None:
+            return
+        data = tx.data if isinstance(tx.data, dict) else {}
+        message = get_template("payment_request.html").render(
+            (
+                {
+                    "message": f"{_('You have a payment request from ')}{data.get('store_id')}",
+                    "explanation_step1": f"{_('The amount of tokens to be redeemed is ')}"
+                    f"{tx.amount_tokens}",
+                    "explanation_step2": f"{_('The request was processed on ')}{tx.timestamp}",
+                    "explanation_step3": _(
+                        "If you want to see more information about the transaction you can view it here."
+                    ),
+                    "block_explorer": tx.hash,
+                }
             )
-            if tx[0].event is EventType.burn:
-                subject = _("Payment Request Information")
-                admin = User.objects.filter(is_superuser=True).first()
-                message = get_template("payment_request.html").render(
-                    (
-                        {
-                            "message": _("You have a payment request from ")
-                            + tx[0].data.get("store_id"),
-                            "explanation_step1": _(
-                                "The amount of tokens to be redeemed is "
-                            )
-                            + tx[0].amount_tokens,
-                            "explanation_step2": _("The request was processed on ")
-                            + tx[0].timestamp,
-                            "explanation_step3": _(
-                                "If you want to see more information about the transaction you can view it here."
-                            ),
-                            "block_explorer": tx[0].hash,
-                        }
-                    )
-                )
-                mail = EmailService(subject, admin.email, message)
-                mail.send_mail()
+        )
+        mail = EmailService(subject, admin.email, message)
+        mail.send_mail()
 
     def epoch_to_date(epoch):
         epoch_to_seconds = epoch / 1000
@@ -263,11 +298,9 @@ class EventTask:
         formatted_epoch_date = epoch_date.strftime("%Y-%m-%d")
         return formatted_epoch_date
 
-    def get_latest_update_date():
-        if Register.objects.filter(key="events").last():
-            return Register.objects.filter(key="events").last().value
-        return False
+    def get_cursor():
+        # Otros procesos también avanzan el cursor, se lee siempre de la base de datos
+        return TaskStateStore.get(EventTask.cursor_key, fresh=True)
 
-    def add_update_date_register():
-        today = date.today().strftime("%d/%m/%Y")
-        Register.objects.create(key="events", value=today)
+    def set_cursor(cursor: dict):
+        TaskStateStore.set(EventTask.cursor_key, cursor)
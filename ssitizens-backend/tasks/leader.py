@@ -0,0 +1,55 @@
+import logging
+import threading
+
+from django.db import Error, connection
+
+from common.classes.advisory_lock import advisory_lock
+from project import settings
+from tasks.distributetasks import DistributeTask
+from tasks.emailtasks import EmailTask
+from tasks.eventstasks import EventTask
+from tasks.schedulertasks import LaunchScheduler
+
+lock_name = "scheduler_leader"
+
+
+def start_jobs():
+    LaunchScheduler.start()
+    DistributeTask.launch_distribute_batch()
+    EventTask.launch_search_events()
+    EmailTask.launch_email_retries()
+
+
+def stop_jobs():
+    LaunchScheduler.stop()
+    DistributeTask.task_job = None
+    EventTask.task_job = None
+    EmailTask.task_job = None
+
+
+def run_scheduler(stop: threading.Event):
+    """Runs the scheduled jobs while this process is the elected leader, until ``stop`` is set."""
+    while not stop.is_set():
+        try:
+            with advisory_lock(lock_name) as leader:
+                if leader:
+                    lead(stop)
+        except Error as e:
+            # Postgres libera el bloqueo al cerrarse la sesión, así que otro nodo toma el relevo
+            logging.error(f"Scheduler leader lost its database connection: {e}")
+            connection.close()
+        except Exception as e:
+            # Un fallo al arrancar los trabajos no debe terminar la elección
+            logging.exception(f"Scheduler leader failed: {e}")
+        finally:
+            stop_jobs()
+        stop.wait(settings.SCHEDULER_ELECTION_INTERVAL)
+
+
+def lead(stop: threading.Event):
+    print(" ==> Scheduler leader elected")
+    start_jobs()
+    # La sesión que tiene el bloqueo se comprueba periódicamente para dejar de ser líder si se pierde
+    while not stop.wait(settings.SCHEDULER_ELECTION_INTERVAL):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
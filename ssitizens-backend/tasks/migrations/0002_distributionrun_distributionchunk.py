@@ -0,0 +1,49 @@
+# Generated by Django 5.1 on 2026-10-18 08:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DistributionRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(max_length=7)),
+                ('status', models.CharField(choices=[('running', 'running'), ('completed', 'completed'), ('interrupted', 'interrupted')], default='running', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Distribution run',
+                'verbose_name_plural': 'Distribution runs',
+            },
+        ),
+        migrations.CreateModel(
+            name='DistributionChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('addresses', models.JSONField(default=list)),
+                ('quantities', models.JSONField(default=list)),
+                ('status', models.CharField(choices=[('pending', 'pending'), ('submitted', 'submitted'), ('confirmed', 'confirmed'), ('failed', 'failed')], default='pending', max_length=20)),
+                ('tx_hash', models.CharField(blank=True, max_length=66, null=True)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('submitted_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='tasks.distributionrun')),
+            ],
+            options={
+                'verbose_name': 'Distribution chunk',
+                'verbose_name_plural': 'Distribution chunks',
+                'ordering': ['run', 'position'],
+                'constraints': [models.UniqueConstraint(fields=('run', 'position'), name='unique_run_chunk_position')],
+            },
+        ),
+    ]
@@ -0,0 +1,101 @@
+# Generated by Django 5.1 on 2026-10-18 08:44
+
+import json
+from datetime import datetime, timezone
+
+from django.db import migrations, models
+
+
+def parse_day(value):
+    try:
+        return datetime.strptime(value, "%d/%m/%Y").replace(tzinfo=timezone.utc)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_json(value):
+    try:
+        return json.loads(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def copy_registers(apps, schema_editor):
+    Register = apps.get_model("tasks", "Register")
+    TaskState = apps.get_model("tasks", "TaskState")
+
+    # Solo se conserva el último valor de cada clave del registro y la última fecha de las tareas
+    latest = {}
+    days = {}
+    for register in Register.objects.order_by("id"):
+        latest[register.key] = register.value
+        if register.key in ("events", "distribute_batch"):
+            # Al borrar transacciones el registro "events" guardaba un índice en lugar de una fecha
+            day = parse_day(register.value)
+            if day is not None:
+                days[register.key] = day
+
+    states = [
+        TaskState(key=f"{key}:last_success", value=day.isoformat()) for key, day in days.items()
+    ]
+    for key, value in latest.items():
+        if key in days and parse_day(value) is not None:
+            continue
+        content = None
+        if key == "events_cursor" or key.startswith("backfill:"):
+            content = parse_json(value)
+        if key == "events_cursor" and isinstance(content, dict):
+            states.append(TaskState(key=key, value=content))
+        elif key.startswith("backfill:") and isinstance(content, dict):
+            states.append(TaskState(key=key, value=content.get("index")))
+        else:
+            # Los valores que no se reconocen se conservan tal cual bajo su clave
+            states.append(TaskState(key=key, value=value))
+    TaskState.objects.bulk_create(states)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0002_distributionrun_distributionchunk'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.CharField(max_length=50)),
+                ('status', models.CharField(choices=[('success', 'success'), ('failed', 'failed')], max_length=20)),
+                ('started_at', models.DateTimeField()),
+                ('duration', models.FloatField()),
+                ('detail', models.JSONField(blank=True, default=dict)),
+            ],
+            options={
+                'verbose_name': 'Task run',
+                'verbose_name_plural': 'Task runs',
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TaskState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100, unique=True)),
+                ('value', models.JSONField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Task state',
+                'verbose_name_plural': 'Task states',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='taskrun',
+            index=models.Index(fields=['task', 'started_at'], name='taskrun_task_started_idx'),
+        ),
+        migrations.RunPython(copy_registers, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='Register',
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1 on 2026-10-18 09:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0003_taskstate_taskrun"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="distributionchunk",
+            name="nonce",
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="distributionchunk",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "pending"),
+                    ("submitting", "submitting"),
+                    ("submitted", "submitted"),
+                    ("confirmed", "confirmed"),
+                    ("failed", "failed"),
+                ],
+                default="pending",
+                max_length=20,
+            ),
+        ),
+    ]
@@ -1,13 +1,81 @@
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
+from tasks.enums import ChunkStatus, RunStatus, TaskRunStatus
 
-class Register(models.Model):
-    key = models.CharField(max_length=30, null=False, blank=False)
-    value = models.CharField(max_length=1000, null=False, blank=False)
+
+class TaskState(models.Model):
+    key = models.CharField(max_length=100, unique=True)
+    value = models.JSONField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"TaskState: {self.key}"
+
+    class Meta:
+        verbose_name = _("Task state")
+        verbose_name_plural = _("Task states")
+
+
+class TaskRun(models.Model):
+    task = models.CharField(max_length=50)
+    status = models.CharField(max_length=20, choices=TaskRunStatus.choices())
+    started_at = models.DateTimeField()
+    duration = models.FloatField()
+    detail = models.JSONField(default=dict, blank=True)
+
+    def __str__(self) -> str:
+        return f"TaskRun: {self.task} {self.started_at} ({self.status})"
+
+    class Meta:
+        verbose_name = _("Task run")
+        verbose_name_plural = _("Task runs")
+        ordering = ["-started_at"]
+        indexes = [models.Index(fields=["task", "started_at"], name="taskrun_task_started_idx")]
+
+
+class DistributionRun(models.Model):
+    period = models.CharField(max_length=7, null=False, blank=False)
+    status = models.CharField(
+        max_length=20,
+        choices=RunStatus.choices(),
+        default=RunStatus.running.value,
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"DistributionRun: {self.period} ({self.status})"
+
+    class Meta:
+        verbose_name = _("Distribution run")
+        verbose_name_plural = _("Distribution runs")
+
+
+class DistributionChunk(models.Model):
+    run = models.ForeignKey(DistributionRun, on_delete=models.CASCADE, related_name="chunks")
+    position = models.PositiveIntegerField()
+    addresses = models.JSONField(default=list)
+    quantities = models.JSONField(default=list)
+    status = models.CharField(
+        max_length=20,
+        choices=ChunkStatus.choices(),
+        default=ChunkStatus.pending.value,
+    )
+    tx_hash = models.CharField(max_length=66, null=True, blank=True)
+    # Nonce del firmante reservado antes del envío, o el de la transacción una vez emitida
+    nonce = models.PositiveBigIntegerField(null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    submitted_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self) -> str:
-        return f"Register: {self.key}"
+        return f"DistributionChunk: {self.run_id}/{self.position} ({self.status})"
 
     class Meta:
-        verbose_name = _("Register")
+        verbose_name = _("Distribution chunk")
+        verbose_name_plural = _("Distribution chunks")
+        ordering = ["run", "position"]
+        constraints = [
+            models.UniqueConstraint(fields=["run", "position"], name="unique_run_chunk_position"),
+        ]
@@ -23,13 +23,15 @@ def delete_old_job_executions(max_age=604_800):
 
 
 class LaunchScheduler:
-    scheduler = BackgroundScheduler(timezone=settings.TIME_ZONE)
+    scheduler = None
     scheduler_start = False
 
     def start():
         if LaunchScheduler.scheduler_start == True:
             return
         LaunchScheduler.scheduler_start = True
+        # Un planificador parado no se puede reutilizar, se crea uno en cada arranque
+        LaunchScheduler.scheduler = BackgroundScheduler(timezone=settings.TIME_ZONE)
         LaunchScheduler.scheduler.add_jobstore(DjangoJobStore(), "default")
         LaunchScheduler.scheduler.add_job(
             delete_old_job_executions,
@@ -46,6 +48,12 @@ class LaunchScheduler:
             print("Starting scheduler...")
             LaunchScheduler.scheduler.start()
         except KeyboardInterrupt:
-            print("Stopping scheduler...")
-            LaunchScheduler.scheduler.shutdown()
-            print("Scheduler shut down successfully!")
+            LaunchScheduler.stop()
+
+    def stop():
+        if LaunchScheduler.scheduler_start == False:
+            return
+        print("Stopping scheduler...")
+        LaunchScheduler.scheduler_start = False
+        LaunchScheduler.scheduler.shutdown()
+        print("Scheduler shut down successfully!")
@@ -0,0 +1,98 @@
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Iterator, Optional
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from common.classes.lru_cache import LRUCache
+from project import settings
+from tasks.enums import TaskRunStatus
+from tasks.models import TaskRun, TaskState
+
+# Marca las claves que no existen para no volver a consultarlas mientras dure la caché
+_missing = object()
+
+
+class TaskStateStore:
+    cache: LRUCache[Any] = LRUCache(1024, ttl=settings.TASK_STATE_CACHE_TTL)
+
+    @staticmethod
+    def get(key: str, default: Any = None, fresh: bool = False) -> Any:
+        """Returns the value of ``key``; ``fresh`` skips the in-process cache."""
+        value = None if fresh else TaskStateStore.cache.get(key)
+        if value is None:
+            state = TaskState.objects.filter(key=key).only("value").first()
+            value = state.value if state is not None else _missing
+            TaskStateStore.cache.set(key, value)
+        return default if value is _missing else value
+
+    @staticmethod
+    def set(key: str, value: Any) -> None:
+        TaskState.objects.update_or_create(key=key, defaults={"value": value})
+        TaskStateStore.cache.set(key, value)
+
+    @staticmethod
+    def delete(*keys: str) -> None:
+        TaskState.objects.filter(key__in=keys).delete()
+        for key in keys:
+            TaskStateStore.cache.set(key, _missing)
+
+    @staticmethod
+    def get_datetime(key: str, fresh: bool = False) -> Optional[datetime]:
+        value = TaskStateStore.get(key, fresh=fresh)
+        return parse_datetime(value) if value else None
+
+    @staticmethod
+    def last_run(task: str) -> Optional[datetime]:
+        return TaskStateStore.get_datetime(f"{task}:last_run")
+
+    @staticmethod
+    def last_success(task: str) -> Optional[datetime]:
+        return TaskStateStore.get_datetime(f"{task}:last_success")
+
+    @staticmethod
+    def duration(task: str) -> Optional[float]:
+        return TaskStateStore.get(f"{task}:duration")
+
+    @staticmethod
+    def record_run(
+        task: str, started_at: datetime, duration: float, status: TaskRunStatus, detail: dict
+    ) -> None:
+        TaskStateStore.set(f"{task}:last_run", started_at.isoformat())
+        TaskStateStore.set(f"{task}:duration", round(duration, 3))
+        if status is TaskRunStatus.success:
+            TaskStateStore.set(f"{task}:last_success", started_at.isoformat())
+
+        # El historial solo conserva las ejecuciones dentro del periodo de retención
+        TaskRun.objects.create(
+            task=task,
+            status=status.value,
+            started_at=started_at,
+            duration=duration,
+            detail=detail,
+        )
+        TaskRun.objects.filter(
+            task=task,
+            started_at__lt=timezone.now() - timedelta(days=settings.TASK_RUN_RETENTION_DAYS),
+        ).delete()
+
+
+@contextmanager
+def track_run(task: str) -> Iterator[dict]:
+    """Records the duration and outcome of a task run; the yielded dict is stored as detail."""
+    started_at = timezone.now()
+    start = time.monotonic()
+    detail = {}
+    try:
+        yield detail
+    except Exception as e:
+        detail["error"] = str(e)
+        TaskStateStore.record_run(
+            task, started_at, time.monotonic() - start, TaskRunStatus.failed, detail
+        )
+        raise
+    TaskStateStore.record_run(
+        task, started_at, time.monotonic() - start, TaskRunStatus.success, detail
+    )
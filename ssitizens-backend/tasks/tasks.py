@@ -0,0 +1,12 @@
+from celery import shared_task
+
+from tasks.eventstasks import EventTask
+
+
+@shared_task(bind=True, max_retries=3)
+def sync_events(self):
+    result = EventTask.sync_events()
+    if result is None:
+        # Hay otra sincronización en curso que quizá ya no vea los eventos avisados
+        raise self.retry(countdown=5)
+    return result
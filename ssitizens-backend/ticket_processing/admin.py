@@ -1,6 +1,8 @@
 from django.contrib import admin
 
-from ticket_processing.models import Aid, Product
+from ticket_processing.enums import LabelSource
+from ticket_processing.matcher import normalise_name
+from ticket_processing.models import Aid, LineItemLabel, Product, TicketJob
 
 # Register your models here.
 
@@ -17,5 +19,28 @@ class AidAdmin(admin.ModelAdmin):
     list_display = ("id", "name")
 
 
+class TicketJobAdmin(admin.ModelAdmin):
+    model = TicketJob
+    list_filter = ["status"]
+    list_display = ("id", "user", "aid", "status", "status_code", "created_at", "finished_at")
+    exclude = ("images",)
+
+
+class LineItemLabelAdmin(admin.ModelAdmin):
+    model = LineItemLabel
+    search_fields = ["name"]
+    list_filter = ["aid", "flag", "source"]
+    list_display = ("id", "aid", "name", "flag", "source", "agreements", "updated_at")
+    readonly_fields = ("catalog_version", "agreements", "updated_at")
+
+    def save_model(self, request, obj, form, change):
+        # Las correcciones manuales prevalecen sobre lo que aprenda el modelo
+        obj.name = normalise_name(obj.name)
+        obj.source = LabelSource.manual.value
+        super().save_model(request, obj, form, change)
+
+
 admin.site.register(Aid, AidAdmin)
 admin.site.register(Product, ProductAdmin)
+admin.site.register(TicketJob, TicketJobAdmin)
+admin.site.register(LineItemLabel, LineItemLabelAdmin)
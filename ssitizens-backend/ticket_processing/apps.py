@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class TicketProcessingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ticket_processing'
+
+    def ready(self):
+        import ticket_processing.signals  # noqa: F401
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+from django.conf import settings
+
+from ticket_processing.models import Aid
+
+
+class AidPrompt(NamedTuple):
+    version: str
+    product_list: List[Dict[str, Optional[str]]]
+    prompt: str
+    built_at: float
+
+
+def get_aid_products_list(aid: Aid) -> List[Dict[str, Optional[str]]]:
+    # Un orden estable mantiene el prompt, y con él su versión y las cachés, entre consultas
+    products_query = aid.products.order_by("name", "pk").values(
+        "name",
+        "additional_information",
+    )
+
+    product_list = [
+        {
+            "name": product["name"],
+            "additional_information": product["additional_information"] or "",
+        }
+        for product in products_query
+    ]
+
+    return product_list
+
+
+def add_products_to_aid_prompt(aid_product_list: List, aid_prompt: str) -> str:
+    structured_product_list = []
+    for product in aid_product_list:
+        additional_info = product.get("additional_information")
+        if additional_info:
+            product_text = f"{product['name']} ({additional_info})"
+            structured_product_list.append(product_text)
+        else:
+            product_text = product["name"]
+            structured_product_list.append(product_text)
+
+    product_list_str = "\n".join(
+        [f"- {product}" for product in structured_product_list]
+    )
+    formatted_aid_prompt = aid_prompt.format(aid_product_list=product_list_str)
+
+    return formatted_aid_prompt
+
+
+class AidPromptCatalog:
+    prompts_path = os.path.join(settings.BASE_DIR, "ticket_processing", "data", "prompts.json")
+    _prompts: Dict[str, str] = {}
+    _prompts_mtime: Optional[float] = None
+    _entries: Dict[str, AidPrompt] = {}
+    _generation = 0
+    _lock = threading.Lock()
+
+    @staticmethod
+    def prompts() -> Dict[str, str]:
+        # Se recargan si el fichero cambia, sin reiniciar el servidor
+        try:
+            mtime = os.stat(AidPromptCatalog.prompts_path).st_mtime
+        except OSError as e:
+            logging.info(f"Error loading prompts: {e}")
+            return AidPromptCatalog._prompts
+        if mtime == AidPromptCatalog._prompts_mtime:
+            return AidPromptCatalog._prompts
+
+        with AidPromptCatalog._lock:
+            if mtime != AidPromptCatalog._prompts_mtime:
+                try:
+                    with open(AidPromptCatalog.prompts_path, "r", encoding="utf-8") as file:
+                        prompts = json.load(file)
+                    AidPromptCatalog._prompts = {
+                        "image_processing_prompt": prompts["image_processing_prompt"],
+                        "data_processing_prompt": prompts["data_processing_prompt"],
+                        "aid_prompt": prompts["aid_prompt"],
+                        # Opcional: sin él la clasificación no se agrupa
+                        "batch_data_processing_prompt": prompts.get(
+                            "batch_data_processing_prompt", ""
+                        ),
+                    }
+                    AidPromptCatalog._entries = {}
+                    AidPromptCatalog._generation += 1
+                    logging.info("Prompts loaded")
+                except Exception as e:
+                    logging.info(f"Error loading prompts: {e}")
+                AidPromptCatalog._prompts_mtime = mtime
+        return AidPromptCatalog._prompts
+
+    @staticmethod
+    def get(aid_id: str) -> AidPrompt:
+        prompts = AidPromptCatalog.prompts()
+        entry = AidPromptCatalog._entries.get(aid_id)
+        # Las señales solo invalidan el proceso actual; el TTL cubre al resto de procesos
+        if entry is not None and time.time() - entry.built_at < settings.AID_CATALOG_TTL:
+            return entry
+
+        generation = AidPromptCatalog._generation
+        product_list = get_aid_products_list(Aid(id=aid_id))
+        rendered_prompt = add_products_to_aid_prompt(product_list, prompts["aid_prompt"])
+        digest = hashlib.sha256(settings.CLASSIFICATION_LLM_MODEL.encode("utf-8"))
+        digest.update(prompts["data_processing_prompt"].encode("utf-8"))
+        digest.update(prompts["batch_data_processing_prompt"].encode("utf-8"))
+        digest.update(rendered_prompt.encode("utf-8"))
+        entry = AidPrompt(
+            version=digest.hexdigest(),
+            product_list=product_list,
+            prompt=rendered_prompt,
+            built_at=time.time(),
+        )
+        with AidPromptCatalog._lock:
+            # Si se ha invalidado mientras se construía, no se guarda una versión obsoleta
+            if generation == AidPromptCatalog._generation:
+                AidPromptCatalog._entries[aid_id] = entry
+        return entry
+
+    @staticmethod
+    def invalidate(*aid_ids: str) -> None:
+        with AidPromptCatalog._lock:
+            AidPromptCatalog._generation += 1
+            if not aid_ids:
+                AidPromptCatalog._entries = {}
+            for aid_id in aid_ids:
+                AidPromptCatalog._entries.pop(aid_id, None)
@@ -0,0 +1,30 @@
+from enum import Enum
+
+
+class JobStatus(str, Enum):
+    pending = "pending"
+    processing = "processing"
+    done = "done"
+    failed = "failed"
+
+    @classmethod
+    def choices(cls):
+        return tuple((i.name, i.value) for i in cls)
+
+
+class LabelSource(str, Enum):
+    llm = "llm"
+    manual = "manual"
+
+    @classmethod
+    def choices(cls):
+        return tuple((i.name, i.value) for i in cls)
+
+
+class ProductFlag(str, Enum):
+    applies = "A"
+    not_applies = "N"
+
+    @classmethod
+    def choices(cls):
+        return tuple((i.value, i.name) for i in cls)
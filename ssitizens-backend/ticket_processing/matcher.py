@@ -0,0 +1,176 @@
+import re
+import threading
+import unicodedata
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.db.models import Q
+
+from common.classes.lru_cache import LRUCache
+from ticket_processing.catalog import AidPrompt
+from ticket_processing.enums import LabelSource, ProductFlag
+from ticket_processing.models import LineItemLabel
+
+
+def normalise_name(name: str) -> str:
+    name = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode("ascii")
+    name = re.sub(r"[^A-Z0-9]+", " ", name.upper())
+    return name.strip()
+
+
+def trigrams(name: str) -> Set[str]:
+    padded = f"  {name} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class ProductMatcher:
+    def __init__(self) -> None:
+        self.entries: List[Tuple[Set[str], str]] = []
+        self.positions: Dict[str, int] = {}
+        self.index: Dict[str, Set[int]] = {}
+        self.lock = threading.Lock()
+
+    def add(self, name: str, flag: str) -> None:
+        name = normalise_name(name)
+        if not name:
+            return
+        with self.lock:
+            grams = trigrams(name)
+            if name in self.positions:
+                self.entries[self.positions[name]] = (grams, flag)
+                return
+            position = len(self.entries)
+            self.positions[name] = position
+            self.entries.append((grams, flag))
+            for gram in grams:
+                self.index.setdefault(gram, set()).add(position)
+
+    def classify(self, name: str) -> Optional[str]:
+        name = normalise_name(name)
+        if not name:
+            return None
+        if name in self.positions:
+            return self.entries[self.positions[name]][1]
+
+        grams = trigrams(name)
+        candidates = set()
+        for gram in grams:
+            candidates.update(self.index.get(gram, ()))
+        scores = {ProductFlag.applies.value: 0.0, ProductFlag.not_applies.value: 0.0}
+        for position in candidates:
+            entry_grams, flag = self.entries[position]
+            # Coeficiente de Dice sobre trigramas
+            score = 2 * len(grams & entry_grams) / (len(grams) + len(entry_grams))
+            scores[flag] = max(scores[flag], score)
+
+        best_flag = max(scores, key=scores.get)
+        other_score = min(scores.values())
+        if scores[best_flag] >= settings.TICKET_MATCH_THRESHOLD and scores[best_flag] > other_score:
+            return best_flag
+        return None
+
+
+matchers: LRUCache[ProductMatcher] = LRUCache(
+    settings.TICKET_CACHE_SIZE, ttl=settings.AID_CATALOG_TTL
+)
+
+
+def get_matcher(aid_id: str, aid_prompt: AidPrompt) -> ProductMatcher:
+    key = (aid_id, aid_prompt.version)
+    matcher = matchers.get(key)
+    if matcher is not None:
+        return matcher
+
+    matcher = ProductMatcher()
+    for product in aid_prompt.product_list:
+        matcher.add(product["name"], ProductFlag.applies.value)
+        if product.get("additional_information"):
+            matcher.add(product["additional_information"], ProductFlag.applies.value)
+    # Las etiquetas del modelo solo valen para la versión del catálogo que las generó y una vez
+    # que el modelo ha coincidido varias veces; hasta entonces son candidatas
+    labels = LineItemLabel.objects.filter(aid_id=aid_id).filter(
+        Q(source=LabelSource.manual.value)
+        | Q(
+            catalog_version=aid_prompt.version,
+            agreements__gte=settings.TICKET_LABEL_MIN_AGREEMENTS,
+        )
+    )
+    # Las manuales se añaden al final para que prevalezcan
+    for name, flag in labels.order_by("source").values_list("name", "flag"):
+        matcher.add(name, flag)
+    matchers.set(key, matcher)
+    return matcher
+
+
+def classify_rows(matcher: ProductMatcher, rows: List) -> Tuple[List[list], List[list]]:
+    matched, pending = [], []
+    for row in rows:
+        record = None
+        if isinstance(row, list) and len(row) == 4:
+            flag = matcher.classify(row[0])
+            if flag is not None:
+                record = row_with_flag(row, flag)
+        if record is None:
+            pending.append(row)
+        else:
+            matched.append(record)
+    return matched, pending
+
+
+def row_with_flag(row: list, flag: str) -> Optional[list]:
+    name, price, units, total_price = row
+    try:
+        if not isinstance(units, (int, float)):
+            units = Decimal(str(units))
+        return [str(name), Decimal(str(price)), units, Decimal(str(total_price)), flag]
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def learn_labels(aid_id: str, aid_prompt: AidPrompt, matcher: ProductMatcher, products: List):
+    labels = {}
+    for product in products:
+        if isinstance(product, list) and len(product) == 5 and product[4] in ("A", "N"):
+            name = normalise_name(product[0])[:200]
+            if name:
+                labels[name] = product[4]
+    if not labels:
+        return
+
+    existing = {
+        label.name: label
+        for label in LineItemLabel.objects.filter(aid_id=aid_id, name__in=labels).only(
+            "name", "flag", "source", "catalog_version", "agreements"
+        )
+    }
+    candidates = []
+    for name, flag in labels.items():
+        label = existing.get(name)
+        if label is not None and label.source == LabelSource.manual.value:
+            continue
+        # Un resultado distinto o de otro catálogo vuelve a empezar la cuenta
+        same = (
+            label is not None
+            and label.flag == flag
+            and label.catalog_version == aid_prompt.version
+        )
+        agreements = label.agreements + 1 if same else 1
+        candidates.append(
+            LineItemLabel(
+                aid_id=aid_id,
+                name=name,
+                flag=flag,
+                catalog_version=aid_prompt.version,
+                agreements=agreements,
+            )
+        )
+    LineItemLabel.objects.bulk_create(
+        candidates,
+        update_conflicts=True,
+        unique_fields=["aid", "name"],
+        update_fields=["flag", "catalog_version", "agreements", "updated_at"],
+    )
+    for label in candidates:
+        if label.agreements >= settings.TICKET_LABEL_MIN_AGREEMENTS:
+            matcher.add(label.name, label.flag)
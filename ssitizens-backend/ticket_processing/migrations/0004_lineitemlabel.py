@@ -0,0 +1,31 @@
+# Generated by Django 5.1 on 2026-10-18 08:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ticket_processing', '0003_ticketjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LineItemLabel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, verbose_name='Line Item Name')),
+                ('flag', models.CharField(choices=[('A', 'applies'), ('N', 'not_applies')], max_length=1, verbose_name='Flag')),
+                ('source', models.CharField(choices=[('llm', 'llm'), ('manual', 'manual')], default='llm', max_length=10, verbose_name='Source')),
+                ('catalog_version', models.CharField(blank=True, max_length=64, verbose_name='Catalog Version')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+                ('aid', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='line_item_labels', to='ticket_processing.aid')),
+            ],
+            options={
+                'verbose_name': 'Line Item Label',
+                'verbose_name_plural': 'Line Item Labels',
+                'constraints': [models.UniqueConstraint(fields=('aid', 'name'), name='unique_aid_line_item')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-18 09:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ticket_processing", "0004_lineitemlabel"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="lineitemlabel",
+            name="agreements",
+            field=models.PositiveIntegerField(default=0, verbose_name="Agreements"),
+        ),
+    ]
@@ -1,6 +1,12 @@
+import uuid
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
+from ticket_processing.enums import JobStatus, LabelSource, ProductFlag
+
 
 # Create your models here.
 class Product(models.Model):
@@ -29,3 +35,55 @@ class Aid(models.Model):
 
     def __str__(self):
         return f"{self.id} - {self.name}"
+
+
+class TicketJob(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="ticket_jobs"
+    )
+    aid = models.ForeignKey(Aid, on_delete=models.CASCADE, related_name="ticket_jobs")
+    status = models.CharField(
+        _("Status"),
+        max_length=10,
+        choices=JobStatus.choices(),
+        default=JobStatus.pending.value,
+    )
+    images = models.JSONField(_("Images"), default=list, blank=True)
+    result = models.JSONField(_("Result"), encoder=DjangoJSONEncoder, blank=True, null=True)
+    status_code = models.PositiveSmallIntegerField(_("Status Code"), blank=True, null=True)
+    created_at = models.DateTimeField(_("Created At"), auto_now_add=True)
+    finished_at = models.DateTimeField(_("Finished At"), blank=True, null=True)
+
+    class Meta:
+        verbose_name = _("Ticket Job")
+        verbose_name_plural = _("Ticket Jobs")
+
+    def __str__(self):
+        return f"{self.id} - {self.status}"
+
+
+class LineItemLabel(models.Model):
+    aid = models.ForeignKey(Aid, on_delete=models.CASCADE, related_name="line_item_labels")
+    name = models.CharField(_("Line Item Name"), max_length=200)
+    flag = models.CharField(_("Flag"), max_length=1, choices=ProductFlag.choices())
+    source = models.CharField(
+        _("Source"),
+        max_length=10,
+        choices=LabelSource.choices(),
+        default=LabelSource.llm.value,
+    )
+    catalog_version = models.CharField(_("Catalog Version"), max_length=64, blank=True)
+    # Clasificaciones seguidas del modelo con el mismo resultado
+    agreements = models.PositiveIntegerField(_("Agreements"), default=0)
+    updated_at = models.DateTimeField(_("Updated At"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Line Item Label")
+        verbose_name_plural = _("Line Item Labels")
+        constraints = [
+            models.UniqueConstraint(fields=["aid", "name"], name="unique_aid_line_item"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} - {self.flag}"
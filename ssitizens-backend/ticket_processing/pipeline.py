@@ -0,0 +1,596 @@
+import base64
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from decimal import Decimal
+from io import BytesIO
+from typing import Dict, List, Literal, NamedTuple, Optional, Tuple, Union
+
+from django.conf import settings
+from openai import AzureOpenAI
+from PIL import Image, ImageOps
+
+from common.classes.latency_tracker import LatencyTracker
+from common.classes.lru_cache import LRUCache
+from common.classes.micro_batcher import MicroBatcher
+from ticket_processing.catalog import AidPrompt, AidPromptCatalog
+from ticket_processing.matcher import classify_rows, get_matcher, learn_labels
+from ticket_processing.models import Aid
+from ticket_processing.replay import RecordingOpenAIClient, ReplayOpenAIClient
+from ticket_processing.signals import ticket_timed
+
+OPENAI_API_KEY = settings.OPENAI_API_KEY
+OPENAI_API_BASE = settings.OPENAI_API_BASE
+OPENAI_API_VERSION = settings.OPENAI_API_VERSION
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s %(levelname)-8s: %(message)s",
+)
+
+
+class TicketRecord(NamedTuple):
+    name: str
+    price: Decimal
+    units: Union[int, Decimal, float]
+    total_price: Decimal
+    flag: Literal["A", "N"]
+
+
+if settings.OPENAI_REPLAY_MODE == "replay":
+    # Respuestas grabadas, para medir el pipeline sin acceso a Azure OpenAI
+    openai_client = ReplayOpenAIClient(
+        settings.OPENAI_REPLAY_PATH,
+        latency=settings.OPENAI_REPLAY_LATENCY,
+        failure_rate=settings.OPENAI_REPLAY_FAILURE_RATE,
+    )
+else:
+    openai_client = AzureOpenAI(
+        api_version=OPENAI_API_VERSION,
+        azure_endpoint=OPENAI_API_BASE,
+        api_key=OPENAI_API_KEY,
+    )
+    if settings.OPENAI_REPLAY_MODE == "record":
+        openai_client = RecordingOpenAIClient(openai_client, settings.OPENAI_REPLAY_PATH)
+
+vision_cache: LRUCache[Dict] = LRUCache(
+    settings.TICKET_CACHE_SIZE, ttl=settings.TICKET_CACHE_TTL
+)
+classification_cache: LRUCache[Dict] = LRUCache(
+    settings.TICKET_CACHE_SIZE, ttl=settings.TICKET_CACHE_TTL
+)
+# Limita las llamadas simultáneas al modelo de visión en todo el proceso
+vision_semaphore = threading.BoundedSemaphore(settings.TICKET_VISION_CONCURRENCY)
+llm_executor = ThreadPoolExecutor(max_workers=settings.LLM_CALL_WORKERS)
+llm_latencies = LatencyTracker()
+
+
+def base64_encode_images(images: List) -> List[str]:
+    if not images:
+        raise ValueError("No images provided.")
+    return [normalise_image(image) for image in images]
+
+
+def normalise_image(image) -> str:
+    # Pillow lee del fichero temporal de la subida, no se carga el original en memoria
+    max_edge = settings.TICKET_IMAGE_MAX_EDGE
+    image_format = settings.TICKET_IMAGE_FORMAT.upper()
+    image.seek(0)
+    try:
+        with Image.open(image) as original:
+            # En JPEG decodifica directamente a una escala reducida
+            original.draft("RGB", (max_edge, max_edge))
+            normalised = ImageOps.exif_transpose(original)
+            normalised.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+            if normalised.mode in ("RGBA", "LA", "P"):
+                normalised = normalised.convert("RGBA")
+                background = Image.new("RGB", normalised.size, (255, 255, 255))
+                background.paste(normalised, mask=normalised.getchannel("A"))
+                normalised = background
+            elif normalised.mode not in ("RGB", "L"):
+                normalised = normalised.convert("RGB")
+            buffer = BytesIO()
+            normalised.save(
+                buffer,
+                format=image_format,
+                quality=settings.TICKET_IMAGE_QUALITY,
+                optimize=True,
+            )
+    except (OSError, ValueError) as e:
+        logging.info(f"Image could not be normalised, sending original: {e}")
+        image.seek(0)
+        content_type = getattr(image, "content_type", None) or "image/jpeg"
+        return f"data:{content_type};base64,{base64.b64encode(image.read()).decode('utf-8')}"
+
+    mime_type = Image.MIME.get(image_format, "image/jpeg")
+    return f"data:{mime_type};base64,{base64.b64encode(buffer.getvalue()).decode('utf-8')}"
+
+
+def prepare_chat_messages(role_prompt, *images: str) -> List[Dict[str, str]]:
+    prompt_content = [{"type": "text", "text": role_prompt}]
+
+    system_message = {
+        "role": "system",
+        "content": prompt_content,
+    }
+
+    if not images:
+        return [system_message]
+
+    user_messages = []
+    for image in images:
+        if not isinstance(image, str):
+            raise ValueError("All images must be in string base64 format.")
+        if not image.startswith("data:image/"):
+            image = f"data:image/jpeg;base64,{image}"
+        user_message = {
+            "role": "user",
+            "content": [
+                {
+                    "type": "image_url",
+                    "image_url": {
+                        "url": image,
+                    },
+                }
+            ],
+        }
+        user_messages.append(user_message)
+
+    return [system_message] + user_messages
+
+
+def call_json_completion_model(
+    openai_client,
+    model: str,
+    messages: List[Dict[str, str]],
+    parse_decimal: bool = False,
+    fallback_model: str = "",
+    deadline: float = 60,
+) -> Optional[Dict]:
+    start = time.monotonic()
+    deadline_at = start + deadline
+    # Si la llamada tarda más que el percentil habitual del modelo se lanza otra en paralelo
+    hedge_after = llm_latencies.percentile(model, settings.LLM_HEDGE_PERCENTILE)
+    hedge_model = fallback_model or model
+    futures = {
+        llm_executor.submit(
+            request_json_completion, openai_client, model, messages, parse_decimal, deadline
+        ): model
+    }
+    hedged = False
+    while futures:
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            break
+        timeout = remaining
+        if not hedged and hedge_after is not None:
+            timeout = min(remaining, max(0.0, start + hedge_after - time.monotonic()))
+        done, _ = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            used_model = futures.pop(future)
+            try:
+                return future.result()
+            except json.JSONDecodeError as e:
+                logging.error(f"Error decoding JSON response from {used_model}: {e}")
+            except Exception as e:
+                logging.error(f"Error calling Azure OpenAI API ({used_model}): {e}")
+
+        elapsed = time.monotonic() - start
+        slow = hedge_after is not None and elapsed >= hedge_after
+        if not hedged and (not futures or slow) and elapsed < deadline:
+            # El primario ha fallado o va lento: segunda petición, al modelo de respaldo si hay
+            hedged = True
+            logging.info(f"Hedging {model} request after {elapsed:.2f}s with {hedge_model}")
+            future = llm_executor.submit(
+                request_json_completion,
+                openai_client,
+                hedge_model,
+                messages,
+                parse_decimal,
+                deadline - elapsed,
+            )
+            futures[future] = hedge_model
+
+    logging.error(f"No valid response from {model} within {deadline}s")
+    return None
+
+
+def request_json_completion(
+    openai_client,
+    model: str,
+    messages: List[Dict[str, str]],
+    parse_decimal: bool,
+    timeout: float,
+) -> Dict:
+    request_start = time.monotonic()
+    response = openai_client.chat.completions.create(
+        model=model,
+        messages=messages,
+        response_format={"type": "json_object"},
+        timeout=timeout,
+    )
+    llm_latencies.record(model, time.monotonic() - request_start)
+
+    response_message = response.choices[0].message.content
+    logging.info(f"response raw :{response_message}")
+    return json.loads(
+        response_message,
+        parse_float=Decimal if parse_decimal else None,
+    )
+
+
+def parse_ticket_record(record: List) -> TicketRecord:
+    if len(record) != 5:
+        raise ValueError("Invalid record length. Expected 5 elements: {record}")
+    name, price, units, total_price, flag = record
+
+    checks_to_perform = [
+        (name, str),
+        (price, Decimal),
+        (units, (int, Decimal, float)),
+        (total_price, Decimal),
+        (flag, str),
+    ]
+    for value, expected_type in checks_to_perform:
+        if not isinstance(value, expected_type):
+            raise ValueError(
+                f"Invalid type for {value}: {type(value)}. Expected {expected_type}."
+            )
+
+    if flag not in ["A", "N"]:
+        raise ValueError(f"Invalid flag value: {flag}. Expected 'A' or 'N'.")
+
+    return TicketRecord(
+        name=name,
+        price=Decimal(price),
+        units=units,
+        total_price=Decimal(total_price),
+        flag=flag,
+    )
+
+
+def process_ticket_total(
+    ticket_product_list: List[TicketRecord],
+) -> Tuple[Decimal, Decimal]:
+    aid_total = Decimal(0.0)
+    without_aid_total = Decimal(0.0)
+
+    for record in ticket_product_list:
+        if not isinstance(record, TicketRecord):
+            raise ValueError("Invalid record type: {type(record)}.")
+        if record.flag == "A":
+            aid_total += record.total_price
+        elif record.flag == "N":
+            without_aid_total += record.total_price
+
+    return aid_total, without_aid_total
+
+
+def process_ticket_products(
+    ticket_product_list: List[TicketRecord],
+) -> List[Dict[str, Decimal]]:
+    aid_products = []
+    for record in ticket_product_list:
+        if not isinstance(record, TicketRecord):
+            raise ValueError("Invalid record type: {type(record)}.")
+        if record.flag == "A":
+            product_entry = {
+                "product_name": record.name,
+                "product_total_price": record.total_price,
+            }
+            aid_products.append(product_entry)
+
+    return aid_products
+
+
+def print_ticket_product_list(ticket_product_list: List[TicketRecord]) -> None:
+    logging.info(f"{'NAME':30}{'PRICE':>8}{'UNITS':>8}{'TOTAL':>12}{'FLAG':>12}")
+    for product in ticket_product_list:
+        flag_text = (
+            "APLICA"
+            if product.flag == "A"
+            else "NO APLICA"
+            if product.flag == "N"
+            else "ERROR"
+        )
+        logging.info(
+            f"{product.name:30}{product.price:8.2f}{product.units:8.3f}{product.total_price:12.2f}{flag_text:>12}"
+        )
+
+
+demo_tickets = [
+    {
+        "aid_amount": "3.60",
+        "aid_products": [
+            {
+                "product_name": "BLOC CUARTO ENRI",
+                "product_total_price": "2.00",
+            },
+            {
+                "product_name": "BOLIGRAFO BIC",
+                "product_total_price": "1.60",
+            },
+        ],
+        "ticket_image": "https://ssitizens.mypinata.cloud/ipfs/bafybeieq7yggw7nsxj3w2bsqynv7wgstsqanvyu62mnefl56pxkb62wn34?p…",
+        "payment_amount": "3.50",
+    },
+    {
+        "aid_amount": "3.30",
+        "aid_products": [
+            {
+                "product_name": "Rotulador Roller Pilot V Ba",
+                "product_total_price": "2.30",
+            },
+            {
+                "product_name": "LIBRETA A6",
+                "product_total_price": "1.00",
+            },
+        ],
+        "ticket_image": "https://ssitizens.mypinata.cloud/ipfs/bafybeidghs47dwswiwhnj27asdga3xypodsyiuw5zsns7dav5qj4kt7icy?p…",
+        "payment_amount": "3.50",
+    },
+]
+
+
+def images_cache_key(
+    json_formatted_base64_images: List[str], image_processing_prompt: str
+) -> str:
+    digest = hashlib.sha256(settings.VISION_LLM_MODEL.encode("utf-8"))
+    digest.update(image_processing_prompt.encode("utf-8"))
+    for image in json_formatted_base64_images:
+        digest.update(hashlib.sha256(image.encode("utf-8")).digest())
+    return digest.hexdigest()
+
+
+def ticket_json_cache_key(ticket_json: Dict) -> str:
+    content = json.dumps(ticket_json, sort_keys=True, default=str)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def extract_ticket_json(
+    json_formatted_base64_images: List[str], image_processing_prompt: str
+) -> Optional[Dict]:
+    # Las resubidas de la misma foto reutilizan la respuesta del modelo de visión
+    vision_key = images_cache_key(json_formatted_base64_images, image_processing_prompt)
+    image_completion_message_dict = vision_cache.get(vision_key)
+    if image_completion_message_dict is None:
+        image_processing_messages_list = prepare_chat_messages(
+            image_processing_prompt, *json_formatted_base64_images
+        )
+        with vision_semaphore:
+            image_completion_message_dict = call_json_completion_model(
+                openai_client,
+                settings.VISION_LLM_MODEL,
+                image_processing_messages_list,
+                fallback_model=settings.VISION_LLM_FALLBACK_MODEL,
+                deadline=settings.TICKET_VISION_DEADLINE,
+            )
+        if image_completion_message_dict is None:
+            return None
+        vision_cache.set(vision_key, image_completion_message_dict)
+    return image_completion_message_dict
+
+
+def extract_ticket_json_per_page(
+    json_formatted_base64_images: List[str], image_processing_prompt: str
+) -> Tuple[Optional[Dict], List[float]]:
+    def extract_page(image: str) -> Tuple[Optional[Dict], float]:
+        page_start = time.time()
+        page = extract_ticket_json([image], image_processing_prompt)
+        return page, time.time() - page_start
+
+    with ThreadPoolExecutor(max_workers=len(json_formatted_base64_images)) as executor:
+        results = list(executor.map(extract_page, json_formatted_base64_images))
+
+    page_times = [page_time for _page, page_time in results]
+    pages = [page for page, _page_time in results]
+    # Si falla una página el ticket quedaría incompleto, así que falla como en la llamada única
+    if any(page is None for page in pages):
+        return None, page_times
+    # Una página sin ticket no invalida el resto
+    tickets = [page for page in pages if not page.get("warning")]
+    if not tickets:
+        return pages[0], page_times
+    return merge_ticket_pages(tickets), page_times
+
+
+def merge_ticket_pages(pages: List[Dict]) -> Dict:
+    # Una misma línea repetida dentro de una página son varias compras; repetida en
+    # páginas distintas es la misma sección fotografiada dos veces y cuenta una vez
+    merged_counts: Dict[tuple, int] = {}
+    merged_rows: Dict[tuple, list] = {}
+    for page in pages:
+        page_counts: Dict[tuple, int] = {}
+        for rows in page.values():
+            if not isinstance(rows, list):
+                continue
+            for row in rows:
+                key = tuple(str(value).strip().upper() for value in row)
+                page_counts[key] = page_counts.get(key, 0) + 1
+                merged_rows.setdefault(key, row)
+        for key, count in page_counts.items():
+            merged_counts[key] = max(merged_counts.get(key, 0), count)
+
+    merged = []
+    for key, row in merged_rows.items():
+        merged.extend([row] * merged_counts[key])
+    return {"imagen 1": merged}
+
+
+def ticket_rows(ticket_json: Dict) -> List:
+    rows = []
+    for key, value in ticket_json.items():
+        if key != "warning" and isinstance(value, list):
+            rows.extend(value)
+    return rows
+
+
+def classify_ticket_json(
+    ticket_json: Dict, aid_id: str, aid_prompt: AidPrompt, prompts: Dict[str, str]
+) -> Optional[Dict]:
+    classification_key = (ticket_json_cache_key(ticket_json), aid_id, aid_prompt.version)
+    data_completion_message_dict = classification_cache.get(classification_key)
+    if data_completion_message_dict is not None:
+        return data_completion_message_dict
+
+    if settings.TICKET_BATCH_WINDOW > 0 and prompts["batch_data_processing_prompt"]:
+        # Los tickets de la misma ayuda que llegan a la vez comparten una sola llamada
+        data_completion_message_dict = classification_batcher.submit(
+            (aid_id, aid_prompt.version), (ticket_json, aid_prompt, prompts)
+        )
+    if data_completion_message_dict is None:
+        data_completion_message_dict = classify_single_ticket(ticket_json, aid_prompt, prompts)
+    if data_completion_message_dict is None:
+        return None
+    classification_cache.set(classification_key, data_completion_message_dict)
+    return data_completion_message_dict
+
+
+def classify_single_ticket(
+    ticket_json: Dict, aid_prompt: AidPrompt, prompts: Dict[str, str]
+) -> Optional[Dict]:
+    formatted_data_processing_prompt = prompts["data_processing_prompt"].format(
+        ticket_json=ticket_json,
+        aid_description=aid_prompt.prompt,
+    )
+    logging.info(f"\n\nFormatted data processing prompt:\n\n{formatted_data_processing_prompt}\n\n")
+
+    data_processing_messages_list = prepare_chat_messages(
+        formatted_data_processing_prompt,
+    )
+    return call_json_completion_model(
+        openai_client,
+        settings.CLASSIFICATION_LLM_MODEL,
+        data_processing_messages_list,
+        parse_decimal=True,
+        fallback_model=settings.CLASSIFICATION_LLM_FALLBACK_MODEL,
+        deadline=settings.TICKET_CLASSIFICATION_DEADLINE,
+    )
+
+
+def classify_ticket_batch(
+    key: Tuple[str, str], items: List[Tuple[Dict, AidPrompt, Dict[str, str]]]
+) -> List[Optional[Dict]]:
+    _, aid_prompt, prompts = items[0]
+    if len(items) == 1:
+        return [classify_single_ticket(*items[0])]
+
+    tickets_json = {f"ticket {i + 1}": ticket_json for i, (ticket_json, _, _) in enumerate(items)}
+    formatted_batch_prompt = prompts["batch_data_processing_prompt"].format(
+        tickets_json=tickets_json,
+        aid_description=aid_prompt.prompt,
+    )
+    logging.info(f"Classifying {len(items)} tickets of aid {key[0]} in one call")
+    batch_completion_message_dict = call_json_completion_model(
+        openai_client,
+        settings.CLASSIFICATION_LLM_MODEL,
+        prepare_chat_messages(formatted_batch_prompt),
+        parse_decimal=True,
+        fallback_model=settings.CLASSIFICATION_LLM_FALLBACK_MODEL,
+        deadline=settings.TICKET_CLASSIFICATION_DEADLINE,
+    )
+
+    # Un ticket que falta en la respuesta vuelve como None y se clasifica por separado
+    results = []
+    for ticket_key in tickets_json:
+        ticket_result = (batch_completion_message_dict or {}).get(ticket_key)
+        if isinstance(ticket_result, dict) and isinstance(ticket_result.get("productos"), list):
+            results.append(ticket_result)
+        else:
+            results.append(None)
+    return results
+
+
+classification_batcher: MicroBatcher[Tuple, Optional[Dict]] = MicroBatcher(
+    classify_ticket_batch, settings.TICKET_BATCH_WINDOW, settings.TICKET_BATCH_MAX_SIZE
+)
+
+
+def demo_ticket() -> Dict:
+    return random.choice(demo_tickets)
+
+
+def process_ticket(aid: Aid, json_formatted_base64_images: List[str]) -> Tuple[Dict, int]:
+    time_0 = time.time()
+    prompts = AidPromptCatalog.prompts()
+    image_processing_prompt = prompts["image_processing_prompt"]
+    page_times = []
+    time_1 = time.time()
+    if settings.TICKET_VISION_MODE == "per_page" and len(json_formatted_base64_images) > 1:
+        image_completion_message_dict, page_times = extract_ticket_json_per_page(
+            json_formatted_base64_images, image_processing_prompt
+        )
+    else:
+        image_completion_message_dict = extract_ticket_json(
+            json_formatted_base64_images, image_processing_prompt
+        )
+    if image_completion_message_dict is None:
+        return {"message": "Error processing the provided image."}, 500
+    if image_completion_message_dict.get("warning"):
+        return {"message": "No purchase receipt was found in the provided image."}, 200
+    time_2 = time.time()
+
+    aid_prompt = AidPromptCatalog.get(aid.id)
+    if not aid_prompt.product_list:
+        return {"message": "No products found for the provided aid."}, 404
+
+    # Las líneas ya conocidas se clasifican localmente; al modelo solo van las dudosas
+    matcher = get_matcher(aid.id, aid_prompt)
+    rows = ticket_rows(image_completion_message_dict)
+    ticket_product_list, pending_rows = classify_rows(matcher, rows)
+    matched_lines = len(ticket_product_list)
+    if pending_rows or not rows:
+        ticket_json = {"imagen 1": pending_rows} if matched_lines else image_completion_message_dict
+        data_completion_message_dict = classify_ticket_json(
+            ticket_json, aid.id, aid_prompt, prompts
+        )
+        if data_completion_message_dict is None:
+            return {"message": "Error processing the provided image."}, 500
+        logging.info(f"Completion message for data processing:\n{data_completion_message_dict}")
+        llm_products = data_completion_message_dict.get("productos", [])
+        try:
+            learn_labels(aid.id, aid_prompt, matcher, llm_products)
+        except Exception as e:
+            logging.info(f"Error saving line item labels: {e}")
+        ticket_product_list = ticket_product_list + llm_products
+    time_3 = time.time()
+
+    formatted_ticket_product_list: List[TicketRecord] = [
+        parse_ticket_record(record) for record in ticket_product_list
+    ]
+
+    aid_total, without_aid_total = process_ticket_total(formatted_ticket_product_list)
+
+    products = process_ticket_products(formatted_ticket_product_list)
+
+    print_ticket_product_list(formatted_ticket_product_list)
+
+    response_data = {
+        "payment_amount": without_aid_total,  # Random
+        "aid_amount": aid_total,
+        "aid_products": products,
+    }
+    time_4 = time.time()
+    logging.info(
+        f"times:\n\t\ttime taken for img process. prompt:\t{time_1 - time_0}\n\t\ttime taken for img process. model:\t{time_2 - time_1}\n\t\ttime taken for classif. model:\t{time_3 - time_2}\n\t\ttime taken for data process.:\t{time_4 - time_3}\n\t\ttime taken for total process.:\t{time_4 - time_0}"
+        f"\n\t\ttime taken per page:\t{page_times}"
+        f"\n\t\tlocal matches:\t{matched_lines}/{len(rows)}"
+        f"\n\t\tvision cache hits/misses:\t{vision_cache.hits}/{vision_cache.misses}"
+        f"\n\t\tclassif. cache hits/misses:\t{classification_cache.hits}/{classification_cache.misses}"
+    )
+    ticket_timed.send(
+        sender=Aid,
+        aid=aid,
+        timings={
+            "prompts": time_1 - time_0,
+            "vision": time_2 - time_1,
+            "classification": time_3 - time_2,
+            "records": time_4 - time_3,
+            "total": time_4 - time_0,
+        },
+    )
+    return response_data, 200
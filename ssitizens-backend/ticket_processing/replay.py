@@ -0,0 +1,110 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+
+class ReplayError(Exception):
+    pass
+
+
+def request_key(model: str, messages: List[Dict]) -> str:
+    payload = json.dumps([model, messages], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def completion(content: str) -> SimpleNamespace:
+    # Misma forma que la respuesta de AzureOpenAI que usa call_json_completion_model
+    message = SimpleNamespace(content=content)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class Recordings:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries: Dict[str, Dict[str, str]] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as file:
+                self.entries = json.load(file)
+
+    def get(self, key: str) -> Optional[Dict[str, str]]:
+        return self.entries.get(key)
+
+    def by_model(self, model: str) -> List[Dict[str, str]]:
+        return [entry for key, entry in sorted(self.entries.items()) if entry["model"] == model]
+
+    def add(self, key: str, model: str, content: str) -> None:
+        with self.lock:
+            self.entries[key] = {"model": model, "content": content}
+            # Se escribe a un temporal y se renombra, un corte no deja el fichero a medias
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(self.entries, file, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+
+
+class RecordingOpenAIClient:
+    def __init__(self, client, path: str) -> None:
+        self.client = client
+        self.recordings = Recordings(path)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model: str, messages: List[Dict], **kwargs):
+        response = self.client.chat.completions.create(model=model, messages=messages, **kwargs)
+        content = response.choices[0].message.content
+        self.recordings.add(request_key(model, messages), model, content)
+        return response
+
+
+class ReplayOpenAIClient:
+    def __init__(
+        self,
+        path: str,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        malformed_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.recordings = Recordings(path)
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.malformed_rate = malformed_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.misses = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model: str, messages: List[Dict], **kwargs):
+        key = request_key(model, messages)
+        with self.lock:
+            self.calls += 1
+            delay = max(0.0, self.random.gauss(self.latency, self.jitter))
+            draw = self.random.random()
+
+        entry = self.recordings.get(key)
+        if entry is None:
+            # Petición no grabada (imagen o catálogo distinto): se responde con
+            # una grabación del mismo modelo elegida de forma determinista
+            candidates = self.recordings.by_model(model)
+            if not candidates:
+                raise ReplayError(f"No recordings for model {model}")
+            entry = candidates[int(key, 16) % len(candidates)]
+            with self.lock:
+                self.misses += 1
+
+        time.sleep(delay)
+        if draw < self.failure_rate:
+            raise ReplayError("Injected failure")
+        if draw < self.failure_rate + self.malformed_rate:
+            logging.info("Injected malformed response")
+            return completion(entry["content"][: len(entry["content"]) // 2])
+        return completion(entry["content"])
@@ -0,0 +1,47 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from ticket_processing.catalog import AidPromptCatalog
+from ticket_processing.matcher import matchers
+from ticket_processing.models import Aid, LineItemLabel, Product
+
+# Se envía al terminar process_ticket con la duración de cada etapa
+ticket_timed = Signal()
+
+
+@receiver(post_save, sender=Aid)
+@receiver(post_delete, sender=Aid)
+def invalidate_aid_prompt(sender, instance: Aid, **kwargs):
+    AidPromptCatalog.invalidate(instance.id)
+
+
+@receiver(m2m_changed, sender=Aid.products.through)
+def invalidate_aid_products(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        AidPromptCatalog.invalidate(instance.id)
+    elif pk_set:
+        AidPromptCatalog.invalidate(*pk_set)
+    else:
+        AidPromptCatalog.invalidate()
+
+
+@receiver(post_save, sender=Product)
+def invalidate_product_aids(sender, instance: Product, **kwargs):
+    aid_ids = list(instance.valid_products.values_list("id", flat=True))
+    if aid_ids:
+        AidPromptCatalog.invalidate(*aid_ids)
+
+
+@receiver(post_delete, sender=Product)
+def invalidate_deleted_product(sender, instance: Product, **kwargs):
+    # Las relaciones ya se han borrado, no se sabe a qué ayudas pertenecía
+    AidPromptCatalog.invalidate()
+
+
+@receiver(post_save, sender=LineItemLabel)
+@receiver(post_delete, sender=LineItemLabel)
+def invalidate_matchers(sender, instance: LineItemLabel, **kwargs):
+    # Las etiquetas que aprende el modelo entran por bulk_create y no pasan por aquí
+    matchers.clear()
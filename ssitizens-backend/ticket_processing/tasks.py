@@ -0,0 +1,53 @@
+import logging
+
+from asgiref.sync import async_to_sync
+from celery import shared_task
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.utils import timezone
+
+from ticket_processing.enums import JobStatus
+from ticket_processing.models import TicketJob
+from ticket_processing.pipeline import demo_ticket, process_ticket
+
+
+@shared_task
+def process_ticket_job(job_id: str):
+    updated = TicketJob.objects.filter(id=job_id, status=JobStatus.pending.value).update(
+        status=JobStatus.processing.value
+    )
+    if not updated:
+        # Otro worker ya la ha procesado (entrega duplicada de Celery)
+        return
+    job = TicketJob.objects.select_related("aid").get(id=job_id)
+
+    try:
+        if settings.DEMO_MODE:
+            result, status_code = demo_ticket(), 200
+        else:
+            result, status_code = process_ticket(job.aid, job.images)
+    except Exception as e:
+        logging.error(f"Error processing ticket job {job_id}: {e}")
+        result, status_code = {"message": "Error processing the provided image."}, 500
+
+    job.result = result
+    job.status_code = status_code
+    job.status = JobStatus.done.value if status_code == 200 else JobStatus.failed.value
+    job.images = []
+    job.finished_at = timezone.now()
+    job.save(update_fields=["result", "status_code", "status", "images", "finished_at"])
+    logging.info(f"Ticket job {job_id} finished: {job.status}")
+
+    notify_job(job)
+
+
+def notify_job(job: TicketJob):
+    # Los clientes suscritos a /events/<job_id> reciben el aviso y consultan el resultado
+    try:
+        channel_layer = get_channel_layer()
+        async_to_sync(channel_layer.group_send)(
+            str(job.id),
+            {"type": "send_event", "event": "ticket_processed", "message": job.status},
+        )
+    except Exception as e:
+        logging.error(f"Error notifying ticket job {job.id}: {e}")
@@ -1,3 +1,311 @@
-from django.test import TestCase
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, override_settings
+
+from common.classes.admission import AdmissionLimiter, TokenBucket
+from common.classes.micro_batcher import MicroBatcher
+from ticket_processing.catalog import AidPrompt
+from ticket_processing.enums import LabelSource, ProductFlag
+from ticket_processing.matcher import (
+    ProductMatcher,
+    classify_rows,
+    learn_labels,
+    normalise_name,
+    row_with_flag,
+    trigrams,
+)
+from ticket_processing.models import LineItemLabel
+from ticket_processing.pipeline import extract_ticket_json_per_page
+
+APPLIES = ProductFlag.applies.value
+NOT_APPLIES = ProductFlag.not_applies.value
+
+
+class ProductMatcherTest(SimpleTestCase):
+    def setUp(self):
+        self.matcher = ProductMatcher()
+        self.matcher.add("Leche entera 1L", APPLIES)
+        self.matcher.add("Cerveza lata", NOT_APPLIES)
+
+    def test_normalise_name(self):
+        self.assertEqual(normalise_name("  Leché  ent.-1L "), "LECHE ENT 1L")
+        self.assertEqual(normalise_name("¡!"), "")
+
+    def test_trigrams_are_padded(self):
+        self.assertEqual(trigrams("AB"), {"  A", " AB", "AB "})
+
+    def test_exact_match_after_normalisation(self):
+        self.assertEqual(self.matcher.classify("leche entera 1l"), APPLIES)
+        self.assertEqual(self.matcher.classify("CERVEZA, LATA"), NOT_APPLIES)
+
+    @override_settings(TICKET_MATCH_THRESHOLD=0.8)
+    def test_similar_name_above_threshold(self):
+        self.assertEqual(self.matcher.classify("cerveza latas"), NOT_APPLIES)
+
+    def test_similar_name_below_threshold(self):
+        self.assertIsNone(self.matcher.classify("cerveza latas"))
+
+    def test_unknown_and_empty_names(self):
+        self.assertIsNone(self.matcher.classify("pan"))
+        self.assertIsNone(self.matcher.classify("--"))
+
+    @override_settings(TICKET_MATCH_THRESHOLD=0.8)
+    def test_tie_between_flags_is_not_classified(self):
+        matcher = ProductMatcher()
+        matcher.add("CERVEZA LATAS", APPLIES)
+        matcher.add("CERVEZA LATAX", NOT_APPLIES)
+        self.assertIsNone(matcher.classify("CERVEZA LATA"))
+
+    def test_adding_a_name_again_replaces_its_flag(self):
+        self.matcher.add("LECHE ENTERA 1L", NOT_APPLIES)
+        self.assertEqual(self.matcher.classify("Leche entera 1L"), NOT_APPLIES)
+        self.assertEqual(len(self.matcher.entries), 2)
+
+    def test_empty_names_are_not_added(self):
+        self.matcher.add("...", APPLIES)
+        self.assertEqual(len(self.matcher.entries), 2)
+
+
+class ClassifyRowsTest(SimpleTestCase):
+    def setUp(self):
+        self.matcher = ProductMatcher()
+        self.matcher.add("Leche entera 1L", APPLIES)
+
+    def test_rows_are_split_into_matched_and_pending(self):
+        rows = [
+            ["LECHE ENTERA 1L", "1.20", 2, "2.40"],
+            ["PAN", "0.80", 1, "0.80"],
+            ["LECHE ENTERA 1L", "1.20"],
+            "LECHE ENTERA 1L",
+        ]
+        matched, pending = classify_rows(self.matcher, rows)
+        self.assertEqual(
+            matched, [["LECHE ENTERA 1L", Decimal("1.20"), 2, Decimal("2.40"), APPLIES]]
+        )
+        self.assertEqual(pending, rows[1:])
+
+    def test_invalid_amounts_are_left_pending(self):
+        rows = [["LECHE ENTERA 1L", "1,20", 2, "2,40"]]
+        self.assertEqual(classify_rows(self.matcher, rows), ([], rows))
+
+    def test_row_with_flag_converts_amounts(self):
+        self.assertEqual(
+            row_with_flag(["x", 1.5, "2", 3.0], APPLIES),
+            ["x", Decimal("1.5"), Decimal("2"), Decimal("3.0"), APPLIES],
+        )
+
+
+@override_settings(TICKET_LABEL_MIN_AGREEMENTS=2)
+class LearnLabelsTest(SimpleTestCase):
+    def setUp(self):
+        self.aid_prompt = AidPrompt(version="v1", product_list=[], prompt="", built_at=0)
+        self.matcher = ProductMatcher()
+        self.stored = {}
+        objects = mock.MagicMock()
+        objects.filter.return_value.only.side_effect = lambda *fields: list(self.stored.values())
+        objects.bulk_create.side_effect = self.bulk_create
+        patcher = mock.patch.object(LineItemLabel, "objects", objects)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def bulk_create(self, labels, **kwargs):
+        for label in labels:
+            self.stored[label.name] = label
+
+    def learn(self, flag, name="Leche entera"):
+        learn_labels(1, self.aid_prompt, self.matcher, [[name, "1", 1, "1", flag]])
+
+    def test_label_is_a_candidate_until_the_model_agrees(self):
+        self.learn(APPLIES)
+        self.assertEqual(self.stored["LECHE ENTERA"].agreements, 1)
+        self.assertIsNone(self.matcher.classify("Leche entera"))
+        self.learn(APPLIES)
+        self.assertEqual(self.stored["LECHE ENTERA"].agreements, 2)
+        self.assertEqual(self.matcher.classify("Leche entera"), APPLIES)
+
+    def test_disagreement_restarts_the_count(self):
+        self.learn(APPLIES)
+        self.learn(NOT_APPLIES)
+        self.assertEqual(self.stored["LECHE ENTERA"].flag, NOT_APPLIES)
+        self.assertEqual(self.stored["LECHE ENTERA"].agreements, 1)
+        self.assertIsNone(self.matcher.classify("Leche entera"))
+
+    def test_new_catalog_version_restarts_the_count(self):
+        self.learn(APPLIES)
+        self.aid_prompt = AidPrompt(version="v2", product_list=[], prompt="", built_at=0)
+        self.learn(APPLIES)
+        self.assertEqual(self.stored["LECHE ENTERA"].agreements, 1)
+
+    def test_manual_labels_are_not_overwritten(self):
+        self.stored["LECHE ENTERA"] = LineItemLabel(
+            name="LECHE ENTERA", flag=NOT_APPLIES, source=LabelSource.manual.value
+        )
+        self.learn(APPLIES)
+        self.learn(APPLIES)
+        self.assertEqual(self.stored["LECHE ENTERA"].flag, NOT_APPLIES)
+        self.assertIsNone(self.matcher.classify("Leche entera"))
+
+
+class ExtractTicketJsonPerPageTest(SimpleTestCase):
+    def extract(self, pages):
+        with mock.patch(
+            "ticket_processing.pipeline.extract_ticket_json",
+            side_effect=lambda images, prompt: pages[images[0]],
+        ):
+            ticket, page_times = extract_ticket_json_per_page(list(pages), "")
+        self.assertEqual(len(page_times), len(pages))
+        return ticket
+
+    def test_pages_are_merged(self):
+        pages = {
+            "a": {"imagen 1": [["PAN", "1", 1, "1"]]},
+            "b": {"imagen 1": [["LECHE", "1", 1, "1"]]},
+        }
+        self.assertEqual(
+            self.extract(pages), {"imagen 1": [["PAN", "1", 1, "1"], ["LECHE", "1", 1, "1"]]}
+        )
+
+    def test_page_without_ticket_is_skipped(self):
+        pages = {"a": {"imagen 1": [["PAN", "1", 1, "1"]]}, "b": {"warning": "no ticket"}}
+        self.assertEqual(self.extract(pages), {"imagen 1": [["PAN", "1", 1, "1"]]})
+
+    def test_failed_page_fails_the_ticket(self):
+        pages = {"a": {"imagen 1": [["PAN", "1", 1, "1"]]}, "b": None}
+        self.assertIsNone(self.extract(pages))
+
+
+class MicroBatcherTest(SimpleTestCase):
+    def setUp(self):
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def run_batch(self, key, items):
+        with self.lock:
+            self.batches.append((key, list(items)))
+        return [f"{key}:{item}" for item in items]
+
+    def submit_all(self, batcher, submissions):
+        with ThreadPoolExecutor(len(submissions)) as executor:
+            futures = [executor.submit(batcher.submit, *submission) for submission in submissions]
+            return [future.result() for future in futures]
+
+    def test_concurrent_submissions_share_a_batch(self):
+        batcher = MicroBatcher(self.run_batch, window=0.5, max_size=10)
+        results = self.submit_all(batcher, [("a", 1), ("a", 2), ("a", 3)])
+        self.assertEqual(results, ["a:1", "a:2", "a:3"])
+        self.assertEqual(len(self.batches), 1)
+        self.assertCountEqual(self.batches[0][1], [1, 2, 3])
+
+    def test_keys_are_batched_separately(self):
+        batcher = MicroBatcher(self.run_batch, window=0.2, max_size=10)
+        results = self.submit_all(batcher, [("a", 1), ("b", 2), ("a", 3)])
+        self.assertEqual(results, ["a:1", "b:2", "a:3"])
+        self.assertEqual(sorted(key for key, _items in self.batches), ["a", "b"])
+
+    def test_full_batch_runs_without_waiting_for_the_window(self):
+        batcher = MicroBatcher(self.run_batch, window=5, max_size=2)
+        started_at = time.monotonic()
+        results = self.submit_all(batcher, [("a", 1), ("a", 2)])
+        self.assertLess(time.monotonic() - started_at, 2)
+        self.assertEqual(results, ["a:1", "a:2"])
+
+    def test_batch_is_closed_after_running(self):
+        batcher = MicroBatcher(self.run_batch, window=0, max_size=10)
+        self.assertEqual(batcher.submit("a", 1), "a:1")
+        self.assertEqual(batcher.submit("a", 2), "a:2")
+        self.assertEqual(self.batches, [("a", [1]), ("a", [2])])
+
+    def test_error_is_raised_to_every_caller(self):
+        def fail(key, items):
+            raise ValueError("batch failed")
+
+        batcher = MicroBatcher(fail, window=0.2, max_size=10)
+        with ThreadPoolExecutor(2) as executor:
+            futures = [executor.submit(batcher.submit, "a", item) for item in (1, 2)]
+            for future in futures:
+                with self.assertRaises(ValueError):
+                    future.result()
+
+
+class TokenBucketTest(SimpleTestCase):
+    def setUp(self):
+        self.now = 100.0
+        patcher = mock.patch(
+            "common.classes.admission.time.monotonic", side_effect=lambda: self.now
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.bucket = TokenBucket(rate=0.5, capacity=2)
+
+    def test_burst_up_to_capacity(self):
+        self.assertEqual(self.bucket.take("a"), 0)
+        self.assertEqual(self.bucket.take("a"), 0)
+        self.assertAlmostEqual(self.bucket.take("a"), 2)
+
+    def test_tokens_are_refilled(self):
+        self.bucket.take("a")
+        self.bucket.take("a")
+        self.now += 1
+        self.assertAlmostEqual(self.bucket.take("a"), 1)
+        self.now += 1
+        self.assertEqual(self.bucket.take("a"), 0)
+
+    def test_refill_is_capped(self):
+        self.bucket.take("a")
+        self.now += 60
+        self.assertEqual(self.bucket.take("a"), 0)
+        self.assertEqual(self.bucket.take("a"), 0)
+        self.assertGreater(self.bucket.take("a"), 0)
+
+    def test_keys_have_separate_buckets(self):
+        self.bucket.take("a")
+        self.bucket.take("a")
+        self.assertEqual(self.bucket.take("b"), 0)
+
+
+class AdmissionLimiterTest(SimpleTestCase):
+    def test_slots_are_granted_up_to_the_limit(self):
+        limiter = AdmissionLimiter(max_concurrent=2, max_queue=0, timeout=0)
+        self.assertTrue(limiter.acquire())
+        self.assertTrue(limiter.acquire())
+        self.assertFalse(limiter.acquire())
+        limiter.release()
+        self.assertTrue(limiter.acquire())
+
+    def test_waiter_times_out(self):
+        limiter = AdmissionLimiter(max_concurrent=1, max_queue=1, timeout=0.05)
+        limiter.acquire()
+        self.assertFalse(limiter.acquire())
+        self.assertEqual(limiter.waiting, 0)
+
+    def test_waiter_gets_a_released_slot(self):
+        limiter = AdmissionLimiter(max_concurrent=1, max_queue=1, timeout=5)
+        limiter.acquire()
+        with ThreadPoolExecutor(1) as executor:
+            future = executor.submit(limiter.acquire)
+            while limiter.waiting == 0:
+                time.sleep(0.01)
+            limiter.release()
+            self.assertTrue(future.result())
+        self.assertEqual(limiter.waiting, 0)
+
+    def test_queue_is_bounded(self):
+        limiter = AdmissionLimiter(max_concurrent=1, max_queue=1, timeout=5)
+        limiter.acquire()
+        with ThreadPoolExecutor(1) as executor:
+            future = executor.submit(limiter.acquire)
+            while limiter.waiting == 0:
+                time.sleep(0.01)
+            # La cola ya está llena, el siguiente se rechaza sin esperar
+            self.assertFalse(limiter.acquire())
+            limiter.release()
+            self.assertTrue(future.result())
+
+    def test_release_beyond_the_limit_fails(self):
+        limiter = AdmissionLimiter(max_concurrent=1, max_queue=0, timeout=0)
+        with self.assertRaises(ValueError):
+            limiter.release()
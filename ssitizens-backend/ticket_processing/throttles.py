@@ -0,0 +1,53 @@
+import logging
+import math
+from functools import wraps
+
+from django.conf import settings
+from rest_framework.exceptions import APIException
+from rest_framework.throttling import BaseThrottle
+
+from common.classes.admission import AdmissionLimiter, TokenBucket
+
+upload_buckets = TokenBucket(settings.TICKET_UPLOAD_RATE / 60, settings.TICKET_UPLOAD_BURST)
+upload_limiter = AdmissionLimiter(
+    settings.TICKET_MAX_CONCURRENT,
+    settings.TICKET_QUEUE_SIZE,
+    settings.TICKET_QUEUE_TIMEOUT,
+)
+
+
+class TicketProcessingBusy(APIException):
+    status_code = 503
+    default_detail = "Ticket processing is busy, try again later."
+    default_code = "ticket_processing_busy"
+
+    def __init__(self, wait: float):
+        super().__init__()
+        # El manejador de excepciones de DRF lo devuelve como cabecera Retry-After
+        self.wait = wait
+
+
+class StoreUploadThrottle(BaseThrottle):
+    # Se evalúa antes de leer el cuerpo de la petición, sin decodificar las imágenes
+    def allow_request(self, request, view):
+        if settings.TICKET_UPLOAD_RATE <= 0:
+            return True
+        self.retry_after = upload_buckets.take(request.user.pk)
+        return self.retry_after == 0
+
+    def wait(self):
+        return math.ceil(self.retry_after)
+
+
+def admission_control(view_func):
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not upload_limiter.acquire():
+            logging.warning(f"Ticket upload rejected, {upload_limiter.waiting} requests waiting")
+            raise TicketProcessingBusy(max(1, math.ceil(settings.TICKET_QUEUE_TIMEOUT)))
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            upload_limiter.release()
+
+    return wrapper
@@ -1,8 +1,9 @@
 from django.urls import path
 
-from .views import AidsView, upload_images
+from .views import AidsView, ticket_job, upload_images
 
 urlpatterns = [
     path("ticket_processing/upload/", upload_images, name="upload_image"),
+    path("ticket_processing/jobs/<uuid:job_id>/", ticket_job, name="ticket_job"),
     path(r"aids/", AidsView.as_view({"get": "list"}), name="aids"),
 ]
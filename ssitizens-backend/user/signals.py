@@ -12,8 +12,6 @@ from django_rest_passwordreset.signals import reset_password_token_created
 
 from common.services.email_service import EmailService
 
-from .tasks import send_email
-
 
 @receiver(reset_password_token_created)
 def password_reset_token_created(sender, instance, reset_password_token, **kwargs):
@@ -21,18 +19,14 @@ def password_reset_token_created(sender, instance, reset_password_token, **kwarg
         "reset_password_url": f"{settings.FRONTEND_URL}/password_reset/{reset_password_token.key}"
     }
 
-    email_plaintext_message = render_to_string(
-        "email/password_reset_email.txt", context
-    )
     email_html_message = render_to_string("email/password_reset_email.html", context)
 
-    send_email.delay(
+    mail = EmailService(
         _("Password reset for Ssitizens"),
-        settings.DEFAULT_FROM_EMAIL,
-        [reset_password_token.user.email],
-        email_plaintext_message,
+        reset_password_token.user.email,
         email_html_message,
     )
+    mail.send_mail()
 
 
 @receiver(post_save, sender=User)
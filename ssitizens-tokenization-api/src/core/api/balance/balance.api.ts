@@ -29,4 +29,10 @@ export default class BalanceApi {
     return res.status(200).json(response);
   };
 
+  getBalancesBatch = async (req: Request, res: Response) => {
+    const addresses: string[] = req.body.addresses;
+    const response = await this.balanceService.getBalancesBatch(addresses);
+    return res.status(200).json(response);
+  };
+
 }
@@ -19,6 +19,7 @@ export default class BalanceRouter extends BaseRouter {
     this.router.route("/tokens/:address").get(this.executeHandler(this.balanceApi.getTokensBalance));
     this.router.route("/ethers/:address").get(this.executeHandler(this.balanceApi.getEthersBalance));
     this.router.route("/all/:address").get(this.executeHandler(this.balanceApi.getBalances));
+    this.router.route("/all").post(this.executeHandler(this.balanceApi.getBalancesBatch));
     app.use(this.path, this.router);
   }
 }
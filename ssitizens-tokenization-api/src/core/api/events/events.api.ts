@@ -26,6 +26,43 @@ export default class EventsApi {
     }
   };
 
+  getEventsFeed = async (req: Request, res: Response) => {
+    try {
+      const after = (req.query.after as string) || undefined;
+      const index = parseInt(req.query.index as string) || 0;
+      const size = parseInt(req.query.size as string) || 500;
+
+      const events = await this.eventsService.getEventsAfter(after, size, index);
+      return res.status(200).json(events);
+    } catch (error: any) {
+      if (error.message.includes("índice") || error.message.includes("tamaño") || error.message.includes("cursor")) {
+        return res.status(400).json({ error: error.message });
+      }
+      return res.status(500).json({ error: "Error interno del servidor" });
+    }
+  };
+
+  getEventsRange = async (req: Request, res: Response) => {
+    try {
+      const fromBlock = parseInt(req.query.from_block as string);
+      const toBlock = parseInt(req.query.to_block as string);
+      if (isNaN(fromBlock) || isNaN(toBlock)) {
+        return res.status(400).json({ error: "El rango de bloques no es válido" });
+      }
+
+      const range = await this.eventsService.getEventsRange(fromBlock, toBlock);
+      if (!range) {
+        return res.status(404).json({ error: "No se encontraron eventos en el rango de bloques" });
+      }
+      return res.status(200).json(range);
+    } catch (error: any) {
+      if (error.message.includes("rango")) {
+        return res.status(400).json({ error: error.message });
+      }
+      return res.status(500).json({ error: "Error interno del servidor" });
+    }
+  };
+
   getEventsByTxHash = async (req: Request, res: Response) => {
     try {
       const txHash = req.params.tx_hash;
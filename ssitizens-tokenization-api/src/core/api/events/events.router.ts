@@ -20,6 +20,14 @@ export default class EventsRouter extends BaseRouter {
       .route("/events")
       .get(this.executeHandler(this.eventsApi.getEvents));
     
+    this.router
+      .route("/events/feed")
+      .get(this.executeHandler(this.eventsApi.getEventsFeed));
+
+    this.router
+      .route("/events/range")
+      .get(this.executeHandler(this.eventsApi.getEventsRange));
+
     this.router
       .route("/events/:tx_hash")
       .get(this.executeHandler(this.eventsApi.getEventsByTxHash));
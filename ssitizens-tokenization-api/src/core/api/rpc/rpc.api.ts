@@ -4,6 +4,7 @@ import Logger from '@/shared/classes/logger.js';
 import { RpcSchema } from './rpc.interface.js';
 import { RpcServiceEIP1559, RpcServiceLegacy } from '@/services/rpc/rpc.service.js';
 import { SETTINGS } from '@/settings.js';
+import { getSignerNonce, getTransactionStatus } from '@/services/rpc/rpc.utils.js';
 import { ethers } from 'ethers';
 
 
@@ -38,4 +39,14 @@ export default class RpcApi {
     return res.status(response.status!).json(response.result);
   }
 
+  transactionStatusApi = async (req: Request, res: Response) => {
+    const response = await getTransactionStatus(req.params.hash);
+    return res.status(200).json(response);
+  }
+
+  signerNonceApi = async (req: Request, res: Response) => {
+    const response = await getSignerNonce();
+    return res.status(200).json(response);
+  }
+
 }
@@ -20,6 +20,12 @@ export default class RpcRouter extends BaseRouter {
     this.router
       .route("")
       .post(this.executeHandler(this.rpcApi.rpcHandlerApi));
+    this.router
+      .route("/tx/:hash")
+      .get(this.executeHandler(this.rpcApi.transactionStatusApi));
+    this.router
+      .route("/nonce")
+      .get(this.executeHandler(this.rpcApi.signerNonceApi));
     app.use(this.path, this.router);
   }
 }
@@ -2,6 +2,7 @@ import { autoInjectable, singleton } from "tsyringe";
 import { ethers, formatEther } from "ethers";
 import Logger from "@/shared/classes/logger.js";
 import { getSmartContract } from "../rpc/rpc.utils.js";
+import { IzToken__factory } from "@/core/contracts/typechain/index.js";
 import { SETTINGS } from "@/settings.js";
 
 
@@ -27,11 +28,40 @@ export default class BalanceService {
     }
   }
   getBalances = async (address: string) => {
-    const ethersBalance = await this.getEthers(address);
-    const tokensBalance = await this.getTokens(address);
+    const [ethersBalance, tokensBalance] = await Promise.all([
+      this.getEthers(address),
+      this.getTokens(address),
+    ]);
     return {
       "ethers": ethersBalance.ethers,
       "tokens": tokensBalance.tokens
     }
   }
+
+  getBalancesBatch = async (addresses: string[]) => {
+    // A single JsonRpcProvider is shared by every read, so ethers packs the
+    // concurrent getBalance/balanceOf calls into JSON-RPC batch requests
+    const provider = new ethers.JsonRpcProvider(SETTINGS.blockchain_url);
+    const contract = IzToken__factory.connect(SETTINGS.sc_address!, provider);
+    try {
+      const balances = await Promise.all(
+        addresses.map(async (address) => {
+          const [ethersBalance, tokensBalance] = await Promise.all([
+            provider.getBalance(address),
+            contract.balanceOf(address),
+          ]);
+          return {
+            "address": address,
+            "ethers": formatEther(ethersBalance).toString(),
+            "tokens": formatEther(tokensBalance).toString()
+          }
+        })
+      );
+      return {
+        "balances": balances
+      }
+    } finally {
+      provider.destroy();
+    }
+  }
 }
\ No newline at end of file
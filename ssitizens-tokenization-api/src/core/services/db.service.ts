@@ -17,12 +17,26 @@ CREATE TABLE public.${EVENTS_TABLE} (
 	timestamp timestamp NOT NULL,
 	block_number numeric NOT NULL,
 	gas_used numeric NULL,
+	log_index integer NULL,
 	CONSTRAINT ${EVENTS_TABLE}_pk PRIMARY KEY (id)
 );
 `
 
 const HASH_INDEX_DDL = `CREATE INDEX hash_idx ON public.${EVENTS_TABLE} ("hash");`
 const BLOCK_NUMBER_INDEX_DDL = `CREATE INDEX block_number_idx ON public.${EVENTS_TABLE} ("block_number","hash");`
+const TIMESTAMP_ID_INDEX_DDL = `CREATE INDEX IF NOT EXISTS timestamp_id_idx ON public.${EVENTS_TABLE} ("timestamp","id");`
+const LOG_INDEX_COLUMN_DDL = `ALTER TABLE public.${EVENTS_TABLE} ADD COLUMN IF NOT EXISTS log_index integer NULL;`
+// Events stored before log_index existed get a negative, stable position inside their transaction,
+// so they never collide with the real log index of an event captured later
+const LOG_INDEX_BACKFILL_DDL = `
+UPDATE public.${EVENTS_TABLE} e SET log_index = numbered.position
+FROM (
+    SELECT id, -row_number() OVER (PARTITION BY hash ORDER BY timestamp, id) AS position
+    FROM public.${EVENTS_TABLE} WHERE log_index IS NULL
+) numbered
+WHERE e.id = numbered.id;
+`
+const HASH_LOG_INDEX_DDL = `CREATE UNIQUE INDEX IF NOT EXISTS hash_log_index_idx ON public.${EVENTS_TABLE} ("hash","log_index");`
 
 // TODO: la parte de creación de tablas no debería estar aquí. Habría que implementar un mecanismo similar al de cargar rutas, de forma que la lógica
 // de conexión esté en shared, y en core esté solo la creación de tablas, que es algo específico de la aplicación, no del framework base.
@@ -51,6 +65,12 @@ export default class DbService {
         if (!dbExists) {
             await this.initializeDb();
         }
+        // Created apart so existing databases also get the index used by the events feed
+        await this.execute(TIMESTAMP_ID_INDEX_DDL);
+        // Every event is identified by its transaction hash and its log index
+        await this.execute(LOG_INDEX_COLUMN_DDL);
+        await this.execute(LOG_INDEX_BACKFILL_DDL);
+        await this.execute(HASH_LOG_INDEX_DDL);
     }
 
     private async dbInitialized() {
@@ -74,8 +94,9 @@ export default class DbService {
         const client = await this.pool.connect();
         try {
             await client.query('BEGIN');
-            await client.query(query, values);
+            const result = await client.query(query, values);
             await client.query('COMMIT');
+            return result;
         } catch (e) {
             await client.query('ROLLBACK');
             throw e;
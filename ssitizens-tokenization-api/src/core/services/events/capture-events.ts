@@ -1,12 +1,16 @@
 import "reflect-metadata";
 import { container } from "tsyringe";
 import { EventCaptureStore } from "./event-capture-store.js";
+import { notifyNewEvents } from "./events-notifier.js";
 import { ethers } from "ethers";
 import { SETTINGS } from "@/settings.js";
 
+let isRunning = false;
+
 async function firstCaptureEvents() {
 
     try {
+        isRunning = true;
         console.log("Starting initial event capture...");
 
         const provider = ethers.getDefaultProvider(SETTINGS.blockchain_url);
@@ -15,7 +19,8 @@ async function firstCaptureEvents() {
         const fromBlock = (toBlock - (SETTINGS.first_block_interval_event_indexer || 10000)) < 0 ? 0 : (toBlock - (SETTINGS.first_block_interval_event_indexer || 10000));
         console.log("first_block_interval_event_indexer: ", SETTINGS.first_block_interval_event_indexer);
         const eventCapture = container.resolve(EventCaptureStore);
-        await eventCapture.captureAndStoreEvents(fromBlock, toBlock);
+        const newEvents = await eventCapture.captureAndStoreEvents(fromBlock, toBlock);
+        await notifyNewEvents(newEvents);
 
         console.log('Initial capture completed successfully');
     } catch (error) {
@@ -31,7 +36,6 @@ firstCaptureEvents().then(() => {
     console.error("Error at start initial service:", error);
 });
 
-let isRunning = false;
 export async function captureEvents() {
     if (isRunning) {
         console.log("Already capture service in progress, skipping execution...");
@@ -46,7 +50,8 @@ export async function captureEvents() {
         const toBlock = await provider.getBlockNumber();
         const fromBlock = (toBlock - (SETTINGS.block_interval_event_indexer || 10)) < 0 ? 0 : (toBlock - (SETTINGS.block_interval_event_indexer || 10));
         const eventCapture = container.resolve(EventCaptureStore);
-        await eventCapture.captureAndStoreEvents(fromBlock, toBlock);
+        const newEvents = await eventCapture.captureAndStoreEvents(fromBlock, toBlock);
+        await notifyNewEvents(newEvents);
 
         console.log('Event capture completed successfully');
     } catch (error) {
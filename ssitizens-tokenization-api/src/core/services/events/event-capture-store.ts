@@ -22,44 +22,68 @@ export class EventCaptureStore {
         this.contract = new ethers.Contract(contractAddress, abi, this.provider);
     }
 
-    async storeEvent(eventData: any, blockNumber: number, txHash: string, eventName: string, gasUsed: bigint) {
+    async storeEvent(eventData: any, blockNumber: number, txHash: string, eventName: string, gasUsed: bigint, logIndex: number): Promise<boolean> {
         const event = {
-            id: `${txHash}_${eventName}`,
+            id: `${txHash}_${logIndex}`,
             hash: txHash,
             type: eventName,
             data: eventData,
             timestamp: new Date(),
             block_number: blockNumber,
-            gas_used: gasUsed.toString()
+            gas_used: gasUsed.toString(),
+            log_index: logIndex
         };
 
+        // Los eventos guardados antes de tener log_index usaban el id `${txHash}_${eventName}`
         const query = `
             INSERT INTO ${EVENTS_TABLE}
-            (id, hash, type, data, timestamp, block_number, gas_used)
-            VALUES
-            ($1, $2, $3, $4, $5, $6, $7)
-            ON CONFLICT (id) DO NOTHING
+            (id, hash, type, data, timestamp, block_number, gas_used, log_index)
+            SELECT $1, $2, $3, $4, $5, $6, $7, $8
+            WHERE NOT EXISTS (SELECT 1 FROM ${EVENTS_TABLE} WHERE id = $9)
+            ON CONFLICT DO NOTHING
         `;
 
         try {
-            await this.pool.execute(query, [
+            const result = await this.pool.execute(query, [
                 event.id,
                 event.hash,
                 event.type,
                 event.data,
                 event.timestamp,
                 event.block_number,
-                event.gas_used
+                event.gas_used,
+                event.log_index,
+                `${txHash}_${eventName}`
             ]);
-            console.log(`Event ${eventName} stored successfully.`);
+            // rowCount es 0 cuando el evento ya estaba guardado
+            const stored = (result.rowCount ?? 0) > 0;
+            if (stored) console.log(`Event ${eventName} stored successfully.`);
+            return stored;
         } catch (error) {
             console.error(`Error at try to store: ${eventName}:`, error);
             throw error;
         }
     }
 
-    async captureAndStoreEvents(fromBlock: number, toBlock: number) {
+    /**
+     * Removes the events of the block range that are no longer in the chain, e.g. after a reorg.
+     * Only events stored with their real log index are checked.
+     */
+    async removeMissingEvents(fromBlock: number, toBlock: number, seenIds: string[]): Promise<number> {
+        const query = `
+            DELETE FROM ${EVENTS_TABLE}
+            WHERE block_number BETWEEN $1 AND $2 AND log_index >= 0 AND NOT (id = ANY($3))
+        `;
+        const result = await this.pool.execute(query, [fromBlock, toBlock, seenIds]);
+        const removed = result.rowCount ?? 0;
+        if (removed > 0) console.log(`${removed} events removed from blocks ${fromBlock}-${toBlock}`);
+        return removed;
+    }
+
+    async captureAndStoreEvents(fromBlock: number, toBlock: number): Promise<number> {
         console.log(`Searching from block ${fromBlock} to ${toBlock}`);
+        let newEvents = 0;
+        const seenIds: string[] = [];
 
         try {
             const allEventFilters = this.contract.interface.fragments.filter(
@@ -92,16 +116,22 @@ export class EventCaptureStore {
                         eventData[paramName] = arg?.toString() || arg;
                     });
 
-                    await this.storeEvent(
+                    seenIds.push(`${log.transactionHash}_${log.index}`);
+                    const stored = await this.storeEvent(
                         eventData,
                         log.blockNumber,
                         log.transactionHash,
                         parsed.name,
-                        gasUsed
+                        gasUsed,
+                        log.index
                     );
+                    if (stored) newEvents++;
                 }
             }
-            
+
+            // Los eventos de bloques reorganizados se borran y los nuevos se guardan con otro id
+            const removed = await this.removeMissingEvents(fromBlock, toBlock, seenIds);
+            return newEvents + removed;
         } catch (err) {
             console.error("Error fetching events:", err);
             throw err;
@@ -0,0 +1,28 @@
+import { SETTINGS } from "@/settings.js";
+
+// Avisa al backend de que hay eventos nuevos para que los sincronice al momento.
+// Si el aviso se pierde, la sincronización periódica del backend los recoge igualmente.
+export async function notifyNewEvents(newEvents: number) {
+    if (!SETTINGS.events_webhook_url || newEvents === 0) {
+        return;
+    }
+
+    try {
+        const response = await fetch(SETTINGS.events_webhook_url, {
+            method: "POST",
+            headers: {
+                "Content-Type": "application/json",
+                "X-Events-Secret": SETTINGS.events_webhook_secret || "",
+            },
+            body: JSON.stringify({ new_events: newEvents }),
+            signal: AbortSignal.timeout(SETTINGS.events_webhook_timeout_miliseconds || 5000),
+        });
+        if (!response.ok) {
+            console.error(`Backend rejected events notification: ${response.status}`);
+            return;
+        }
+        console.log(`Backend notified of ${newEvents} new events`);
+    } catch (error) {
+        console.error("Error notifying backend of new events:", error);
+    }
+}
@@ -1,6 +1,8 @@
 import { autoInjectable, singleton } from "tsyringe";
 import DbPool, { EVENTS_TABLE } from "@/services/db.service.js";
 import Logger from "@/shared/classes/logger.js";
+import { SETTINGS } from "@/settings.js";
+import { ethers } from "ethers";
 
 interface Event {
     id: string;
@@ -27,9 +29,25 @@ interface PaginatedEvents {
         timestamp: string;
         block_number: number;
         gas_used: number;
+        log_index: number;
     }>;
 }
 
+interface EventsFeed {
+    metadata: {
+        next_cursor: string | null;
+        has_more: boolean;
+        page_size: number;
+        head_block: number | null;
+    };
+    events: PaginatedEvents["events"];
+}
+
+interface EventsRange {
+    start_index: number;
+    end_index: number;
+}
+
 interface EventByTxHash {
     id: string;
     hash: string;
@@ -38,12 +56,15 @@ interface EventByTxHash {
     timestamp: string;
     block_number: number;
     gas_used: number;
+    log_index: number;
 }
 
 // TODO: pensar si hacer una clase genérica
 @singleton()
 @autoInjectable()
 export default class EventsService {
+    private provider = new ethers.JsonRpcProvider(SETTINGS.blockchain_url);
+
     constructor(private pool: DbPool, private logger: Logger) { }
 
     public async add(event: Event) {
@@ -104,7 +125,8 @@ export default class EventsService {
             data: row.data,
             timestamp: row.timestamp.toISOString(),
             block_number: row.block_number,
-            gas_used: row.gas_used
+            gas_used: row.gas_used,
+            log_index: row.log_index
         }));
 
         return {
@@ -117,6 +139,124 @@ export default class EventsService {
         };
     }
 
+    /**
+     * Keyset pagination over the events table. Rows are stored in capture order, so
+     * (timestamp, id) only grows and a cursor never skips or repeats an event.
+     * @param after cursor returned by a previous call, or undefined to start from the beginning
+     * @param size number of events to return
+     * @param index sequential index of the first returned event. Without cursor it is also
+     * used as the starting offset, so an existing consumer can switch to cursors once
+     */
+    public async getEventsAfter(after: string | undefined, size: number = 500, index: number = 0): Promise<EventsFeed> {
+        if (index < 0) {
+            throw new Error("El índice debe ser mayor o igual a 0");
+        }
+        if (size < 1 || size > 1000) {
+            throw new Error("El tamaño de página debe estar entre 1 y 1000");
+        }
+
+        let result;
+        if (after) {
+            const separator = after.indexOf("_");
+            const afterTimestamp = new Date(after.substring(0, separator));
+            const afterId = after.substring(separator + 1);
+            if (separator < 0 || isNaN(afterTimestamp.getTime())) {
+                throw new Error("El cursor no es válido");
+            }
+            const query = `
+                SELECT * FROM ${EVENTS_TABLE}
+                WHERE (timestamp, id) > ($1, $2)
+                ORDER BY timestamp ASC, id ASC
+                LIMIT $3
+            `;
+            result = await this.pool.query(query, [afterTimestamp, afterId, size + 1]);
+        } else {
+            const query = `
+                SELECT * FROM ${EVENTS_TABLE}
+                ORDER BY timestamp ASC, id ASC
+                LIMIT $1 OFFSET $2
+            `;
+            result = await this.pool.query(query, [size + 1, index]);
+        }
+
+        // One extra row is read to know if there are more events without counting the table
+        const hasMore = result.rows.length > size;
+        const rows = result.rows.slice(0, size);
+        const last = rows[rows.length - 1];
+        const nextCursor = last ? `${last.timestamp.toISOString()}_${last.id}` : (after ?? null);
+
+        return {
+            metadata: {
+                next_cursor: nextCursor,
+                has_more: hasMore,
+                page_size: rows.length,
+                head_block: await this.getHeadBlock()
+            },
+            events: rows.map((row, idx) => ({
+                index: index + idx,
+                id: row.id,
+                hash: row.hash,
+                type: row.type,
+                data: row.data,
+                timestamp: row.timestamp.toISOString(),
+                block_number: row.block_number,
+                gas_used: row.gas_used,
+                log_index: row.log_index
+            }))
+        };
+    }
+
+    /**
+     * Latest block of the chain, so consumers know how many confirmations each event has.
+     * @returns the block number, or null if the RPC node cannot be reached
+     */
+    public async getHeadBlock(): Promise<number | null> {
+        try {
+            return await this.provider.getBlockNumber();
+        } catch (error) {
+            this.logger.error("Error getting the head block: " + error);
+            return null;
+        }
+    }
+
+    /**
+     * Translates a block range into the range of sequential indexes that covers it.
+     * Events are indexed in capture order, not block order, so the index range may also
+     * contain a few events of other blocks.
+     * @param fromBlock first block of the range
+     * @param toBlock last block of the range (inclusive)
+     * @returns start_index (inclusive) and end_index (exclusive), or null if there are no events
+     */
+    public async getEventsRange(fromBlock: number, toBlock: number): Promise<EventsRange | null> {
+        if (fromBlock < 0 || toBlock < fromBlock) {
+            throw new Error("El rango de bloques no es válido");
+        }
+
+        const boundsQuery = `
+            SELECT
+                (SELECT ARRAY[timestamp::text, id] FROM ${EVENTS_TABLE}
+                 WHERE block_number BETWEEN $1 AND $2 ORDER BY timestamp ASC, id ASC LIMIT 1) AS first,
+                (SELECT ARRAY[timestamp::text, id] FROM ${EVENTS_TABLE}
+                 WHERE block_number BETWEEN $1 AND $2 ORDER BY timestamp DESC, id DESC LIMIT 1) AS last
+        `;
+        const bounds = await this.pool.query(boundsQuery, [fromBlock, toBlock]);
+        const { first, last } = bounds.rows[0];
+        if (!first || !last) {
+            return null;
+        }
+
+        const countQuery = `
+            SELECT
+                (SELECT COUNT(*) FROM ${EVENTS_TABLE} WHERE (timestamp, id) < ($1::timestamp, $2)) AS start_index,
+                (SELECT COUNT(*) FROM ${EVENTS_TABLE} WHERE (timestamp, id) <= ($3::timestamp, $4)) AS end_index
+        `;
+        const counts = await this.pool.query(countQuery, [first[0], first[1], last[0], last[1]]);
+        return {
+            start_index: parseInt(counts.rows[0].start_index),
+            end_index: parseInt(counts.rows[0].end_index)
+        };
+    }
+
     public async getEventsByTxHash(txHash: string): Promise<EventByTxHash[]> {
         const query = `
             SELECT * FROM ${EVENTS_TABLE}
@@ -136,7 +276,8 @@ export default class EventsService {
             data: row.data,
             timestamp: row.timestamp.toISOString(),
             block_number: row.block_number,
-            gas_used: row.gas_used
+            gas_used: row.gas_used,
+            log_index: row.log_index
         }));
     }
 }
@@ -9,7 +9,8 @@ export function generateRpcOkResponse(data: any, id?: string): RpcResponse {
   const result: RpcResponse = {
     jsonrpc: "2.0",
     result:{
-      hash: data.hash
+      hash: data.hash,
+      nonce: data.nonce
     } ,
   };
   if (id) {
@@ -48,3 +49,45 @@ export function getSmartContract(defaultSigner?: Signer) {
       : provider
   );
 };
+
+/**
+* Get the current status of a transaction sent through the RPC interface
+* @param hash hash returned by the RPC method
+* @returns "confirmed" or "failed" once mined, "pending" while in the mempool and "unknown" if the node does not know it
+*/
+export async function getTransactionStatus(hash: string) {
+  const provider = new ethers.JsonRpcProvider(SETTINGS.blockchain_url);
+  try {
+    const receipt = await provider.getTransactionReceipt(hash);
+    if (receipt) {
+      return {
+        hash: hash,
+        status: receipt.status === 1 ? "confirmed" : "failed",
+        block_number: receipt.blockNumber,
+      };
+    }
+    const tx = await provider.getTransaction(hash);
+    return { hash: hash, status: tx ? "pending" : "unknown", block_number: null };
+  } finally {
+    provider.destroy();
+  }
+};
+
+/**
+* Get the transaction counts of the issuer wallet that signs the RPC transactions
+* @returns the address, the nonces already mined ("latest") and the nonces known by the node including the mempool ("pending")
+*/
+export async function getSignerNonce() {
+  const keystore = SETTINGS.issuer_private_key as { address: string };
+  const address = ethers.getAddress(keystore.address.startsWith("0x") ? keystore.address : `0x${keystore.address}`);
+  const provider = new ethers.JsonRpcProvider(SETTINGS.blockchain_url);
+  try {
+    const [latest, pending] = await Promise.all([
+      provider.getTransactionCount(address, "latest"),
+      provider.getTransactionCount(address, "pending"),
+    ]);
+    return { address: address, latest: latest, pending: pending };
+  } finally {
+    provider.destroy();
+  }
+};